@@ -1,32 +1,176 @@
 # adapters/openai_adapter.py
 # OpenAI API adapter for compatibility
 
-from openai import OpenAI
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import httpx
+from openai import OpenAI, RateLimitError, APIConnectionError, InternalServerError
+import redis
+from tenacity import (
+    retry, stop_after_attempt, wait_exponential_jitter, retry_if_exception_type, before_sleep_log,
+)
 import config
 
+# Per-request limits for the embeddings endpoint: at most 2048 inputs and
+# ~300k tokens. Stay a bit under the token cap since the estimate is rough.
+MAX_BATCH = max(1, min(config.OPENAI_EMBED_BATCH, 2048))
+MAX_BATCH_TOKENS = 250_000
+
+# Shared across calls so concurrent embed_texts callers stay under the RPM limit
+_RPM_SEMAPHORE = threading.Semaphore(max(1, config.OPENAI_EMBED_RPM // 60))
+
+logger = logging.getLogger(__name__)
+
+# Only these are worth retrying (429s, dropped connections/timeouts, 5xx);
+# everything else fails fast and is wrapped in RuntimeError by the caller.
+_TRANSIENT_ERRORS = (RateLimitError, APIConnectionError, InternalServerError)
+_retry_transient = retry(
+    reraise=True,
+    stop=stop_after_attempt(5),
+    wait=wait_exponential_jitter(initial=1, max=30),
+    retry=retry_if_exception_type(_TRANSIENT_ERRORS),
+    before_sleep=before_sleep_log(logger, logging.WARNING),
+)
+
+# Lazily created Redis client for the embedding cache (None when disabled)
+_REDIS = None
+_CACHE_DTYPE = np.dtype(config.EMBEDDING_CACHE_DTYPE)
+
+# Process-wide client so every caller shares one keep-alive connection pool
+_CLIENT = None
+_CLIENT_LOCK = threading.Lock()
+
 def create_client():
-    """Create OpenAI client with error handling."""
+    """Return the shared OpenAI client, creating it on first use."""
+    global _CLIENT
+    if _CLIENT is not None:
+        return _CLIENT
+    with _CLIENT_LOCK:
+        if _CLIENT is None:
+            try:
+                _CLIENT = OpenAI(
+                    api_key=config.OPENAI_API_KEY,
+                    http_client=httpx.Client(
+                        limits=httpx.Limits(max_connections=64, max_keepalive_connections=32),
+                    ),
+                )
+            except Exception as e:
+                raise RuntimeError(f"Failed to create OpenAI client: {e}")
+    return _CLIENT
+
+def _estimate_tokens(text):
+    """Rough token count (~4 chars per token)."""
+    return len(text) // 4
+
+def _batch_windows(texts):
+    """Yield (offset, sub_texts) windows within the item and token limits."""
+    start = 0
+    while start < len(texts):
+        end = start
+        tokens = 0
+        while end < len(texts) and end - start < MAX_BATCH:
+            t = _estimate_tokens(texts[end])
+            if end > start and tokens + t > MAX_BATCH_TOKENS:
+                break
+            tokens += t
+            end += 1
+        yield start, texts[start:end]
+        start = end
+
+@_retry_transient
+def _create_embeddings(client, texts, model):
+    with _RPM_SEMAPHORE:
+        resp = client.embeddings.create(model=model, input=texts)
+    return np.asarray([data.embedding for data in resp.data], dtype=np.float32)
+
+def _get_redis():
+    """Return the shared Redis client, or None if the cache is disabled."""
+    global _REDIS
+    if not config.EMBEDDING_REDIS_URL:
+        return None
+    if _REDIS is None:
+        _REDIS = redis.Redis.from_url(config.EMBEDDING_REDIS_URL)
+    return _REDIS
+
+def _cache_key(model, text):
+    # dtype is part of the key so switching EMBEDDING_CACHE_DTYPE never
+    # decodes bytes written with the other width
+    return f"emb:{model}:{_CACHE_DTYPE.name}:{hashlib.blake2b(text.encode(), digest_size=16).hexdigest()}"
+
+def _encode_vector(vec):
+    return np.asarray(vec, dtype=_CACHE_DTYPE).tobytes()
+
+def _decode_vector(raw):
+    return np.frombuffer(raw, dtype=_CACHE_DTYPE).astype(np.float32)
+
+def _cache_get_many(r, keys):
+    """MGET cached vectors; a Redis failure counts as all misses."""
     try:
-        return OpenAI(api_key=config.OPENAI_API_KEY)
-    except Exception as e:
-        raise RuntimeError(f"Failed to create OpenAI client: {e}")
+        return [_decode_vector(raw) if raw is not None else None for raw in r.mget(keys)]
+    except Exception:
+        logger.exception("Redis cache read failed")
+        return [None] * len(keys)
 
-def embed_texts(client, texts, model="text-embedding-3-small"):
-    """Embed texts with retry."""
+def _cache_set_many(r, items):
+    """SETEX fresh vectors in a single pipelined round-trip."""
     try:
-        resp = client.embeddings.create(model=model, input=texts)
-        return [data.embedding for data in resp.data]
+        pipe = r.pipeline(transaction=False)
+        for key, vec in items:
+            pipe.setex(key, config.EMBEDDING_CACHE_TTL_SECONDS, _encode_vector(vec))
+        pipe.execute()
+    except Exception:
+        logger.exception("Redis cache write failed")
+
+def _embed_uncached(client, texts, model):
+    """Embed texts in parallel sub-batches; returns a (len(texts), dim) float32 array."""
+    windows = list(_batch_windows(texts))
+    if len(windows) == 1:
+        return _create_embeddings(client, windows[0][1], model)
+    workers = max(1, min(config.OPENAI_EMBED_CONCURRENCY, len(windows)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        # windows are contiguous and in order, so concatenating restores input order
+        futures = [pool.submit(_create_embeddings, client, window, model) for _, window in windows]
+        return np.concatenate([fut.result() for fut in futures])
+
+def embed_texts(client, texts, model="text-embedding-3-small", as_list=False):
+    """Embed texts, serving hits from the Redis cache and batching the misses.
+
+    Returns a float32 array of shape (len(texts), dim); pass `as_list=True`
+    for the legacy list-of-lists result.
+    """
+    try:
+        if not texts:
+            arr = np.empty((0, config.PINECONE_VECTOR_DIM), dtype=np.float32)
+            return arr.tolist() if as_list else arr
+
+        r = _get_redis()
+        if r is None:
+            arr = _embed_uncached(client, texts, model)
+        else:
+            keys = [_cache_key(model, t) for t in texts]
+            rows = _cache_get_many(r, keys)
+            misses = [i for i, vec in enumerate(rows) if vec is None]
+            if misses:
+                fresh = _embed_uncached(client, [texts[i] for i in misses], model)
+                for i, vec in zip(misses, fresh):
+                    rows[i] = vec
+                _cache_set_many(r, [(keys[i], rows[i]) for i in misses])
+            arr = np.stack(rows)
+        return arr.tolist() if as_list else arr
     except Exception as e:
         raise RuntimeError(f"Embedding failed: {e}")
 
+@_retry_transient
+def _create_chat_completion(client, messages, model, **kwargs):
+    return client.chat.completions.create(model=model, messages=messages, **kwargs)
+
 def chat_completion(client, messages, model="gpt-4o-mini", **kwargs):
-    """Chat completion with retry."""
+    """Chat completion, retrying transient API errors with jittered backoff."""
     try:
-        resp = client.chat.completions.create(
-            model=model,
-            messages=messages,
-            **kwargs
-        )
+        resp = _create_chat_completion(client, messages, model, **kwargs)
         return resp.choices[0].message.content
     except Exception as e:
-        raise RuntimeError(f"Chat completion failed: {e}")
\ No newline at end of file
+        raise RuntimeError(f"Chat completion failed: {e}")
@@ -1,15 +1,60 @@
 # adapters/pinecone_adapter.py
 # Pinecone API adapter for compatibility
 
+import asyncio
+import functools
+import logging
+import threading
 from pinecone import Pinecone, ServerlessSpec
+from pinecone.exceptions import PineconeApiException, ServiceException
+from tenacity import (
+    retry, stop_after_attempt, wait_exponential_jitter, retry_if_exception, before_sleep_log,
+)
+try:
+    # gRPC transport ships with the `pinecone[grpc]` extra
+    from pinecone.grpc import PineconeGRPC
+    _GRPC_AVAILABLE = True
+except Exception:
+    PineconeGRPC = None
+    _GRPC_AVAILABLE = False
 import config
 
+# Pinecone accepts at most 1000 vectors per upsert request
+UPSERT_BATCH = 1000
+
+logger = logging.getLogger(__name__)
+
+def _is_transient(exc):
+    """Retry throttling (429) and server-side (5xx) failures only."""
+    if isinstance(exc, ServiceException):
+        return True
+    return isinstance(exc, PineconeApiException) and getattr(exc, "status", None) == 429
+
+_retry_transient = retry(
+    reraise=True,
+    stop=stop_after_attempt(5),
+    wait=wait_exponential_jitter(initial=1, max=30),
+    retry=retry_if_exception(_is_transient),
+    before_sleep=before_sleep_log(logger, logging.WARNING),
+)
+
+# Process-wide client so index handles share one connection pool
+_CLIENT = None
+_CLIENT_LOCK = threading.Lock()
+
 def create_client():
-    """Create Pinecone client."""
-    try:
-        return Pinecone(api_key=config.PINECONE_API_KEY)
-    except Exception as e:
-        raise RuntimeError(f"Failed to create Pinecone client: {e}")
+    """Return the shared Pinecone client (gRPC when available), creating it on first use."""
+    global _CLIENT
+    if _CLIENT is not None:
+        return _CLIENT
+    with _CLIENT_LOCK:
+        if _CLIENT is None:
+            try:
+                client_cls = PineconeGRPC if _GRPC_AVAILABLE else Pinecone
+                _CLIENT = client_cls(api_key=config.PINECONE_API_KEY)
+            except Exception as e:
+                raise RuntimeError(f"Failed to create Pinecone client: {e}")
+    return _CLIENT
 
 def list_indexes(client):
     """List indexes with compatibility."""
@@ -26,16 +71,38 @@ def create_index(client, name, dimension, metric="cosine", spec=None):
     except Exception as e:
         raise RuntimeError(f"Index creation failed: {e}")
 
+@_retry_transient
+def _query(index, **kwargs):
+    return index.query(**kwargs)
+
 def query_index(index, **kwargs):
-    """Query index with compatibility."""
+    """Query index, retrying throttling/5xx errors with jittered backoff."""
+    try:
+        return _query(index, **kwargs)
+    except Exception as e:
+        raise RuntimeError(f"Query failed: {e}")
+
+async def query_batch(index, vectors, top_k=10, **kwargs):
+    """Run one query per vector in parallel; results keep the input order."""
+    loop = asyncio.get_running_loop()
     try:
-        return index.query(**kwargs)
+        return await asyncio.gather(*[
+            loop.run_in_executor(None, functools.partial(_query, index, vector=v, top_k=top_k, **kwargs))
+            for v in vectors
+        ])
     except Exception as e:
         raise RuntimeError(f"Query failed: {e}")
 
+@_retry_transient
+def _upsert(index, vectors):
+    if len(vectors) > UPSERT_BATCH:
+        return index.upsert(vectors, batch_size=UPSERT_BATCH, show_progress=False)
+    return index.upsert(vectors)
+
 def upsert_index(index, vectors):
-    """Upsert vectors."""
+    """Upsert vectors in requests of at most UPSERT_BATCH vectors, retrying
+    throttling/5xx errors with jittered backoff."""
     try:
-        return index.upsert(vectors)
+        return _upsert(index, vectors)
     except Exception as e:
         raise RuntimeError(f"Upsert failed: {e}")
\ No newline at end of file
@@ -1,127 +1,201 @@
 """Async Neo4j helpers.
 
-Async versions of graph fetch helpers. Drivers are bound to event loops to
-avoid cross-loop problems on Windows.
+Async versions of graph fetch helpers. Queries go through the single driver
+owned by the background runner loop, so every caller shares one connection
+pool (drivers must stay on the loop that created them on Windows).
 """
-from typing import List, Dict, Any
-from neo4j import AsyncGraphDatabase
-import config
+from typing import List, Dict, Any, Optional
+from collections import OrderedDict
 import asyncio
-from async_runner import create_driver, submit_and_wait, submit_sync
-
-
-# Map drivers by event-loop id so drivers are bound to the loop they were
-# created on. This prevents using a driver created for a closed loop in a new
-# one (which leads to 'NoneType' send errors on Windows/Proactor).
-_ASYNC_DRIVERS: Dict[int, AsyncGraphDatabase] = {}
-
-
-def get_async_driver() -> AsyncGraphDatabase:
-    """Return a driver tied to the current event loop (create if missing)."""
-    loop = asyncio.get_running_loop()
-    key = id(loop)
-    driver = _ASYNC_DRIVERS.get(key)
-    if driver is None:
-        pool_size = getattr(config, "NEO4J_MAX_CONN_POOL_SIZE", None)
-        if pool_size is not None:
-            driver = AsyncGraphDatabase.driver(
-                config.NEO4J_URI,
-                auth=(config.NEO4J_USER, config.NEO4J_PASSWORD),
-                max_connection_pool_size=pool_size,
-            )
-        else:
-            driver = AsyncGraphDatabase.driver(
-                config.NEO4J_URI, auth=(config.NEO4J_USER, config.NEO4J_PASSWORD)
-            )
-        _ASYNC_DRIVERS[key] = driver
-    return driver
-
-
-def submit_fetch_graph(node_ids: list):
+import time
+from neo4j import Query
+import config
+from graph import _round_robin
+from async_runner import (
+    get_or_create_driver_async,
+    in_runner_loop,
+    new_driver,
+    submit_and_wait,
+)
+
+
+class _TTLCache:
+    """Small LRU cache whose entries expire after `ttl` seconds."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Any, tuple]" = OrderedDict()
+
+    def get(self, key) -> Optional[Any]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        expires, value = item
+        if expires < time.monotonic():
+            self._data.pop(key, None)
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key, value) -> None:
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+
+# Per-node fact lists; travel queries keep hitting the same top-K ids
+_NODE_FACTS_CACHE = _TTLCache(
+    maxsize=getattr(config, "GRAPH_CACHE_MAX_ENTRIES", 10000),
+    ttl=getattr(config, "GRAPH_CACHE_TTL_SECONDS", 300),
+)
+
+# Merged results per node id tuple. The key keeps the caller's order, since
+# order decides which facts survive the 50-fact cut.
+_RESULT_CACHE = _TTLCache(
+    maxsize=getattr(config, "GRAPH_RESULT_CACHE_MAX_ENTRIES", 2048),
+    ttl=getattr(config, "GRAPH_CACHE_TTL_SECONDS", 300),
+)
+
+
+# Neighborhood query for one node, built once. Capping the 1-hop rows before
+# expanding keeps a hub neighbor from fanning out into a huge 2-hop
+# intermediate result ahead of the final LIMIT; DISTINCT drops repeated
+# (neighbor, rel type) pairs and duplicate rows from parallel relationships.
+# The timeout is enforced server-side so a slow query releases its pooled
+# connection.
+_FETCH_QUERY = Query(
+    "MATCH (n:Entity {id: $nid})-[r]-(m:Entity) "
+    "WITH DISTINCT n, type(r) AS rel, m LIMIT 50 "
+    "OPTIONAL MATCH (m)-[r2]-(o:Entity) WHERE o <> n "
+    "RETURN DISTINCT rel, labels(m) AS labels, m.id AS id, m.name AS name, "
+    "substring(coalesce(m.description, ''), 0, 400) AS description, "
+    "type(r2) AS rel2, labels(o) AS labels2, o.id AS id2, o.name AS name2, "
+    "substring(coalesce(o.description, ''), 0, 400) AS description2 "
+    "LIMIT 100",
+    timeout=getattr(config, "NEO4J_QUERY_TIMEOUT_SECONDS", 5.0),
+)
+
+
+async def _ensure_and_fetch(node_ids: List[str], use_cache: bool = True) -> List[Dict[str, Any]]:
+    """Get the shared driver and fetch, all within one runner-loop task."""
+    driver = await get_or_create_driver_async()
+    return await fetch_graph_context_async(node_ids, driver=driver, use_cache=use_cache)
+
+
+def submit_fetch_graph(node_ids: list, use_cache: bool = True):
     """Sync-friendly submitter that runs the async fetch in the background runner
     and returns the result. This avoids asyncio.run overhead in sync callers.
+    Driver lookup and fetch share a single cross-thread submission.
     """
     if not node_ids:
         return []
 
-    # Ensure the background runner has created a driver; create_driver will
-    # run in the runner and return a driver bound to that loop.
-    try:
-        create_driver()
-    except Exception:
-        # If runner is disabled or creation fails, fall back to sync wrapper
-        return submit_and_wait(fetch_graph_context_async(node_ids))
-
-    # Submit the actual coroutine to the runner and wait for result
-    return submit_and_wait(fetch_graph_context_async(node_ids))
+    return submit_and_wait(_ensure_and_fetch(node_ids, use_cache=use_cache))
 
 
-async def close_async_driver() -> None:
-    """Close the driver for the current event loop if present."""
-    loop = asyncio.get_running_loop()
-    key = id(loop)
-    driver = _ASYNC_DRIVERS.pop(key, None)
-    if driver is not None:
-        try:
-            await driver.close()
-        except Exception:
-            pass
-
-
-async def close_all_async_drivers() -> None:
-    """Close all known async drivers (best-effort)."""
-    # Copy keys to avoid mutation during iteration
-    keys = list(_ASYNC_DRIVERS.keys())
-    for k in keys:
-        d = _ASYNC_DRIVERS.pop(k, None)
-        if d is not None:
-            try:
-                await d.close()
-            except Exception:
-                pass
-
-
-async def fetch_graph_context_async(node_ids: List[str]) -> List[Dict[str, Any]]:
-    """Fetch neighbors (1- and 2-hop) for the provided node ids."""
-    if not node_ids:
-        return []
-
+async def _fetch_one(driver, node_id: str) -> List[Dict[str, Any]]:
+    """Run the neighborhood query for a single node and return its facts."""
     facts: List[Dict[str, Any]] = []
-    # Reuse a persistent driver created in the current event loop. This
-    # avoids the cost of creating/closing the driver on every call, which was
-    # the primary source of latency in the benchmark.
-    driver = get_async_driver()
+    # One session per node: sessions are not safe to share between the
+    # concurrently running fetches.
     async with driver.session() as session:
-            query = (
-                "UNWIND $node_ids AS nid "
-                "MATCH (n:Entity {id: nid})-[r]-(m:Entity) "
-                "OPTIONAL MATCH (m)-[r2]-(o:Entity) WHERE o <> n "
-                "RETURN type(r) AS rel, labels(m) AS labels, m.id AS id, "
-                "m.name AS name, m.type AS type, m.description AS description, "
-                "type(r2) AS rel2, labels(o) AS labels2, o.id AS id2, "
-                "o.name AS name2, o.type AS type2, o.description AS description2 "
-                "LIMIT 100"
-            )
-            result = await session.run(query, node_ids=node_ids)
-            async for r in result:
-                # 1-hop fact
+        result = await session.run(_FETCH_QUERY, nid=node_id)
+        # Fetch all rows as plain value lists and unpack positionally rather
+        # than doing a keyed Record lookup per field.
+        rows = await result.values()
+        seen_hop1 = set()
+        for rel, labels, mid, name, desc, rel2, labels2, oid, name2, desc2 in rows:
+            # 1-hop fact (once per neighbor, not once per 2-hop row)
+            if (mid, rel) not in seen_hop1:
+                seen_hop1.add((mid, rel))
                 facts.append({
                     "source": None,
-                    "rel": r["rel"],
-                    "target_id": r["id"],
-                    "target_name": r["name"],
-                    "target_desc": (r["description"] or "")[:400],
-                    "labels": r["labels"],
+                    "rel": rel,
+                    "target_id": mid,
+                    "target_name": name,
+                    "target_desc": desc,
+                    "labels": labels,
+                })
+            # 2-hop fact if exists
+            if rel2:
+                facts.append({
+                    "source": mid,
+                    "rel": rel2,
+                    "target_id": oid,
+                    "target_name": name2,
+                    "target_desc": desc2,
+                    "labels": labels2,
                 })
-                # 2-hop fact if exists
-                if r.get("rel2"):
-                    facts.append({
-                        "source": r["id"],
-                        "rel": r["rel2"],
-                        "target_id": r["id2"],
-                        "target_name": r["name2"],
-                        "target_desc": (r["description2"] or "")[:400],
-                        "labels": r["labels2"],
-                    })
-
-    return facts[:50]
+    return facts
+
+
+async def fetch_graph_context_async(node_ids: List[str], driver=None, use_cache: bool = True) -> List[Dict[str, Any]]:
+    """Fetch neighbors (1- and 2-hop) for the provided node ids.
+
+    Facts are cached per node id; cache misses are fetched from Neo4j
+    concurrently, one query per node, over the pooled driver. Without an
+    explicit `driver` the shared runner driver is used; callers on some other
+    event loop get a one-off driver that is closed afterwards.
+    `use_cache=False` bypasses both caches and always queries Neo4j (used
+    by the benchmark).
+    """
+    if not node_ids:
+        return []
+
+    key = tuple(node_ids)
+    if use_cache:
+        cached_result = _RESULT_CACHE.get(key)
+        if cached_result is not None:
+            return list(cached_result)
+
+    per_node: Dict[str, List[Dict[str, Any]]] = {}
+    misses = []
+    for nid in node_ids:
+        cached = _NODE_FACTS_CACHE.get(nid) if use_cache else None
+        if cached is not None:
+            per_node[nid] = cached
+        elif nid not in misses:
+            misses.append(nid)
+
+    if misses:
+        own_driver = None
+        if driver is None:
+            if in_runner_loop():
+                driver = await get_or_create_driver_async()
+            else:
+                driver = own_driver = new_driver()
+        try:
+            results = await asyncio.gather(*[_fetch_one(driver, nid) for nid in misses])
+        finally:
+            if own_driver is not None:
+                await own_driver.close()
+        for nid, facts in zip(misses, results):
+            if use_cache:
+                _NODE_FACTS_CACHE.set(nid, facts)
+            per_node[nid] = facts
+
+    # Same merge as graph.fetch_graph_context: every seed's 1-hop facts
+    # round-robin, then the 2-hop facts, so one busy seed can't take the
+    # whole 50-fact budget
+    seeds = list(dict.fromkeys(node_ids))
+    seen_hop1 = set()
+    hop1_by_seed: List[List[Dict[str, Any]]] = []
+    for nid in seeds:
+        hop1 = []
+        for f in per_node[nid]:
+            # a neighbour shared by several seeds is listed once
+            if f["source"] is None and (f["target_id"], f["rel"]) not in seen_hop1:
+                seen_hop1.add((f["target_id"], f["rel"]))
+                hop1.append(f)
+        hop1_by_seed.append(hop1)
+    facts = _round_robin(hop1_by_seed)
+    facts += _round_robin([[f for f in per_node[nid] if f["source"] is not None] for nid in seeds])
+    facts = facts[:50]
+    if use_cache:
+        _RESULT_CACHE.set(key, facts)
+    return list(facts)
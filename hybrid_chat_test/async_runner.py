@@ -1,8 +1,8 @@
 """Background async runner.
 
 Run an asyncio loop in a daemon thread so sync code can submit coroutines
-without using `asyncio.run` each time. Provides helpers to create/close a
-loop-bound Neo4j driver.
+without using `asyncio.run` each time. Owns the single process-wide Neo4j
+async driver, which is bound to the background loop.
 """
 import threading
 import asyncio
@@ -16,36 +16,52 @@ from neo4j import AsyncGraphDatabase
 _loop = None
 _thread = None
 _started = False
+_start_lock = threading.Lock()
+# Shared async driver, created lazily inside the background loop
+_driver = None
 
 
-def _start_loop():
-    """Start the event loop in a thread (internal)."""
-    global _loop
-    _loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(_loop)
-    _loop.run_forever()
+def _start_loop(loop):
+    """Run the event loop in a thread (internal)."""
+    asyncio.set_event_loop(loop)
+    loop.run_forever()
 
 
 def start_background_loop():
-    global _thread, _started
-    if _started:
-        return
-    _thread = threading.Thread(target=_start_loop, daemon=True)
-    _thread.start()
-    _started = True
+    global _loop, _thread, _started
+    # Locked: the CLI prewarm thread and the main thread may race to start it
+    with _start_lock:
+        if _started:
+            return
+        # Create the loop up front so callers can submit to it immediately
+        _loop = asyncio.new_event_loop()
+        _thread = threading.Thread(target=_start_loop, args=(_loop,), daemon=True)
+        _thread.start()
+        _started = True
 
 
 def stop_background_loop():
-    global _loop, _thread, _started
+    """Close the shared driver, then stop and close the loop (also run at exit)."""
+    global _loop, _thread, _started, _driver
     if not _started:
         return
+    if _driver is not None and _loop is not None and _loop.is_running():
+        # Close on the loop that owns the driver so its sockets are released
+        # instead of lingering until interpreter teardown.
+        try:
+            asyncio.run_coroutine_threadsafe(_driver.close(), _loop).result(timeout=5.0)
+        except Exception:
+            pass
     if _loop is not None:
         _loop.call_soon_threadsafe(_loop.stop)
     if _thread is not None:
         _thread.join(timeout=1.0)
+    if _loop is not None and not _loop.is_running():
+        _loop.close()
     _loop = None
     _thread = None
     _started = False
+    _driver = None
 
 
 atexit.register(stop_background_loop)
@@ -70,33 +86,54 @@ def submit_and_wait(coro) -> Any:
     return fut.result()
 
 
-async def _create_driver_in_loop():
-    # Called inside the background loop
+def in_runner_loop() -> bool:
+    """True when called from a coroutine running on the background loop."""
+    try:
+        return asyncio.get_running_loop() is _loop
+    except RuntimeError:
+        return False
+
+
+def new_driver():
+    """Build a Neo4j async driver bound to the loop it is first used on."""
     return AsyncGraphDatabase.driver(
         config.NEO4J_URI,
         auth=(config.NEO4J_USER, config.NEO4J_PASSWORD),
-        max_connection_pool_size=getattr(config, "NEO4J_MAX_CONN_POOL_SIZE", 50),
+        max_connection_pool_size=getattr(config, "NEO4J_MAX_CONN_POOL_SIZE", 100),
+        connection_acquisition_timeout=getattr(config, "NEO4J_CONNECTION_ACQUISITION_TIMEOUT", 60.0),
     )
 
 
+async def _create_driver_in_loop():
+    # Called inside the background loop
+    return new_driver()
+
+
+async def get_or_create_driver_async():
+    """Return the shared driver; must be awaited on the background loop."""
+    global _driver
+    if not in_runner_loop():
+        raise RuntimeError("The shared Neo4j driver is bound to the background loop")
+    if _driver is None:
+        _driver = new_driver()
+    return _driver
+
+
+def get_or_create_driver():
+    """Sync accessor for the shared driver (starts the runner if needed)."""
+    if _driver is not None:
+        return _driver
+    return submit_and_wait(get_or_create_driver_async())
+
+
 def create_driver():
     """Create a Neo4j async driver inside the background loop and return it."""
     if not _started:
         start_background_loop()
-
-    # Schedule the synchronous _create_driver_in_loop to run in the background
-    # loop's default executor and wait for result.
-    fut = asyncio.run_coroutine_threadsafe(
-        _run_in_executor(_create_driver_in_loop), _loop
-    )
+    fut = asyncio.run_coroutine_threadsafe(_create_driver_in_loop(), _loop)
     return fut.result()
 
 
-async def _run_in_executor(func):
-    loop = asyncio.get_running_loop()
-    return await loop.run_in_executor(None, func)
-
-
 def close_driver(driver):
     """Close a driver object inside the background loop."""
     if driver is None:
@@ -108,3 +145,11 @@ def close_driver(driver):
             pass
 
     submit_and_wait(_close())
+
+
+def close_shared_driver():
+    """Close the shared driver (if any) so the next use creates a fresh one."""
+    global _driver
+    driver, _driver = _driver, None
+    if driver is not None and _started:
+        close_driver(driver)
@@ -9,24 +9,24 @@ The script will:
 
 Notes:
  - The async fetcher is called via the sync wrapper `fetch_graph_context_async_wrapper` so
-   you don't need to change existing code to benchmark it.
+   you don't need to change existing code to benchmark it. It submits to the background
+   runner loop, so the shared driver and its pool stay warm across iterations.
+ - The async fetcher's graph caches are bypassed (`use_cache=False`) for every timed call,
+   so both methods measure real Neo4j round-trips rather than dict lookups.
  - If you have a running Neo4j instance and want realistic results, set `BENCH_NODE_IDS`
    environment variable to a comma-separated list of node ids.
 """
 
 import os
+import gc
 import time
 import math
 import statistics
 from typing import List
 
 from graph import fetch_graph_context, fetch_graph_context_async_wrapper
-from async_graph import (
-    fetch_graph_context_async,
-    get_async_driver,
-    close_async_driver,
-    close_all_async_drivers,
-)
+from async_graph import fetch_graph_context_async
+from async_runner import get_or_create_driver_async, submit_and_wait, close_shared_driver
 import asyncio
 import json
 import csv
@@ -43,19 +43,31 @@ def parse_node_ids() -> List[str]:
 
 
 def time_func(func, args=(), iterations=5):
+    """Time `func(*args)` per iteration in seconds (callers warm up first).
+
+    GC is paused while timing so a collection can't land mid-iteration, and
+    the single slowest run is dropped once there are at least 5 samples.
+    """
     times = []
+    gc_was_enabled = gc.isenabled()
     for i in range(iterations):
-        t0 = time.perf_counter()
+        gc.disable()
         try:
+            t0 = time.perf_counter_ns()
             func(*args)
+            t1 = time.perf_counter_ns()
         except Exception as e:
             print(f"Iteration {i+1} raised: {e}")
             times.append(float('nan'))
             continue
-        t1 = time.perf_counter()
-        times.append(t1 - t0)
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+        times.append((t1 - t0) / 1e9)
     # filter out failed runs (NaN values)
     times = [t for t in times if not (isinstance(t, float) and math.isnan(t))]
+    if len(times) >= 5:
+        times.remove(max(times))
     return times
 
 
@@ -100,7 +112,7 @@ def main():
 
     # Warmup async wrapper
     try:
-        fetch_graph_context_async_wrapper(node_ids)
+        fetch_graph_context_async_wrapper(node_ids, use_cache=False)
     except Exception as e:
         print("Async warmup raised:", e)
 
@@ -108,7 +120,7 @@ def main():
     sync_times = time_func(fetch_graph_context, args=(node_ids,), iterations=iterations)
 
     print("Timing async fetcher (via sync wrapper)...")
-    async_times = time_func(fetch_graph_context_async_wrapper, args=(node_ids,), iterations=iterations)
+    async_times = time_func(fetch_graph_context_async_wrapper, args=(node_ids, False), iterations=iterations)
 
     summarize("Sync fetch_graph_context", sync_times)
     summarize("Async fetch_graph_context_async (wrapper)", async_times)
@@ -116,34 +128,40 @@ def main():
     # Concurrent async benchmark
     print("Running concurrent async benchmark...")
     async def run_concurrent():
-        # Ensure driver is created in this loop
-        get_async_driver()
+        # Runs on the background runner loop, which owns the shared driver
+        driver = await get_or_create_driver_async()
 
         async def worker(latencies: list):
             t0 = time.perf_counter()
-            await fetch_graph_context_async(node_ids)
+            await fetch_graph_context_async(node_ids, driver=driver, use_cache=False)
             t1 = time.perf_counter()
             latencies.append(t1 - t0)
 
         times = []
         all_latencies = []
+        throughputs = []
         for _ in range(concurrent_iters):
             latencies = []
-            await asyncio.gather(*[worker(latencies) for _ in range(concurrency)])
-            # per-round time
-            times.append(sum(latencies) / max(1, len(latencies)))
+            t_start = time.perf_counter()
+            tasks = [asyncio.create_task(worker(latencies)) for _ in range(concurrency)]
+            # consume tasks as they finish so each latency is recorded at its
+            # own completion rather than when the slowest task is done
+            for fut in asyncio.as_completed(tasks):
+                await fut
+            t_end = time.perf_counter()
+            # per-round wall-clock time and requests/s for the whole round
+            times.append(t_end - t_start)
+            throughputs.append(concurrency / max(t_end - t_start, 1e-9))
             all_latencies.append(latencies)
-        return times, all_latencies
+        return times, all_latencies, throughputs
 
     try:
-        res = asyncio.run(run_concurrent())
-        if isinstance(res, tuple):
-            loop_times, per_task_latencies = res
-        else:
-            loop_times = res
-            per_task_latencies = None
+        loop_times, per_task_latencies, throughputs = submit_and_wait(run_concurrent())
 
-        summarize(f"Concurrent async: {concurrency} parallel tasks", loop_times)
+        summarize(f"Concurrent async: {concurrency} parallel tasks (round wall time)", loop_times)
+        if throughputs:
+            print(f"throughput: {statistics.mean(throughputs):.1f} req/s (mean over rounds)")
+            print()
 
         if per_task_latencies:
             # flatten list of lists
@@ -172,13 +190,14 @@ def main():
                     "p50": percentile(flat,50),
                     "p95": percentile(flat,95),
                     "p99": percentile(flat,99),
+                    "throughput_rps": statistics.mean(throughputs) if throughputs else None,
                 }
                 with open(json_path, "w") as f:
                     json.dump(summary, f, indent=2)
     finally:
-        # cleanup drivers created in any event loop
+        # cleanup the shared driver owned by the runner loop
         try:
-            asyncio.run(close_all_async_drivers())
+            close_shared_driver()
         except Exception:
             pass
 
@@ -1,10 +1,53 @@
 # cli.py
 # Command-line interface for the chat assistant
 
-from typing import List
-from vector_search import query_pinecone
-from graph import fetch_graph_context
-from prompting import build_prompt, call_chat, validate_response, sanitize_answer, expand_citations
+import logging
+import threading
+from typing import Dict, List
+import config
+import async_runner
+import embed
+from adapters import openai_adapter
+from vector_search import async_query_pinecone
+from async_graph import fetch_graph_context_async
+from async_runner import submit_and_wait
+from prompting import build_prompt, async_call_chat, validate_response, sanitize_answer, expand_citations
+
+
+async def _handle(query: str, preferences: Dict[str, str]) -> str:
+    """Answer one question: vector search, graph fetch, then chat."""
+    # Query vector DB
+    matches = await async_query_pinecone(query, top_k=10)  # Updated to 10
+    match_ids = [m["id"] for m in matches]
+
+    trip_length = 4 if '4' in query else 3
+
+    # Fetch graph context with error handling
+    try:
+        graph_facts = await fetch_graph_context_async(match_ids)
+    except Exception as e:
+        print(f"Warning: Could not fetch graph context ({e}). Using vector-only response.")
+        graph_facts = []
+
+    # Build and call prompt
+    prompt = build_prompt(query, matches, graph_facts, preferences)
+    # first attempt
+    answer = await async_call_chat(prompt, max_tokens=1100)
+
+    # validate and retry once if incomplete (common cause: token truncation)
+    validation = validate_response(answer, trip_length)
+    if validation != "Valid":
+        # silently retry once to complete the response (no user-facing message)
+        followup = [
+            {"role": "user", "content": "The previous response was incomplete. Please complete the missing day(s) and ensure all days are covered."}
+        ]
+        prompt_extended = prompt + followup
+        answer = await async_call_chat(prompt_extended, max_tokens=1200)
+
+    # expand citation placeholders like [city_da_lat] to readable tags, then sanitize
+    answer_expanded = expand_citations(answer, matches, graph_facts)
+    return sanitize_answer(answer_expanded)
+
 
 def interactive_chat():
     """Run interactive chat loop."""
@@ -13,44 +56,38 @@ def interactive_chat():
     budget = input("Enter your budget (e.g., low, medium, high): ").strip().lower() or "medium"
     interests = input("Enter your interests (e.g., romantic, adventure, culture): ").strip().lower() or "romantic"
     preferences = {"budget": budget, "interests": interests}
-    
+
     while True:
         query = input("\nEnter your travel question: ").strip()
         if not query or query.lower() in ("exit", "quit"):
             break
 
-        # Query vector DB
-        matches = query_pinecone(query, top_k=10)  # Updated to 10
-        match_ids = [m["id"] for m in matches]
-
-        # Fetch graph context with error handling
-        try:
-            graph_facts = fetch_graph_context(match_ids)
-        except Exception as e:
-            print(f"Warning: Could not fetch graph context ({e}). Using vector-only response.")
-            graph_facts = []
-
-        # Build and call prompt
-        prompt = build_prompt(query, matches, graph_facts, preferences)
-        # first attempt
-        answer = call_chat(prompt, max_tokens=1100)
-
-        # validate and retry once if incomplete (common cause: token truncation)
-        validation = validate_response(answer, 4 if '4' in query else 3)
-        if validation != "Valid":
-            # silently retry once to complete the response (no user-facing message)
-            followup = [
-                {"role": "user", "content": "The previous response was incomplete. Please complete the missing day(s) and ensure all days are covered."}
-            ]
-            prompt_extended = prompt + followup
-            answer = call_chat(prompt_extended, max_tokens=1200)
-
-        # expand citation placeholders like [city_da_lat] to readable tags, then sanitize
-        answer_expanded = expand_citations(answer, matches, graph_facts)
-        answer_clean = sanitize_answer(answer_expanded)
+        # Each question runs on the long-lived background loop, which owns the
+        # shared Neo4j driver and HTTP sessions (no new loop per question).
+        answer_clean = submit_and_wait(_handle(query, preferences))
         print("\n=== Assistant Answer ===\n")
         print(answer_clean)
         print("\n=== End ===\n")
 
+
+def _prewarm():
+    """Start the runner and open the Neo4j and OpenAI connection pools."""
+    try:
+        async_runner.start_background_loop()
+        driver = async_runner.get_or_create_driver()
+        # forces the first Bolt connection (and TLS handshake) now
+        submit_and_wait(driver.verify_connectivity())
+        # query embeddings use the aiohttp session on the runner loop, chat
+        # uses the shared httpx client; put one live connection in each pool
+        submit_and_wait(embed.prewarm_session())
+        openai_adapter.create_client().models.list()
+    except Exception:
+        logging.getLogger(__name__).debug("Prewarm failed", exc_info=True)
+
+
+if config.PREWARM_ON_IMPORT and config.ENABLE_ASYNC_RUNNER:
+    threading.Thread(target=_prewarm, name="prewarm", daemon=True).start()
+
+
 if __name__ == "__main__":
-    interactive_chat()
\ No newline at end of file
+    interactive_chat()
@@ -17,14 +17,40 @@ PINECONE_INDEX_NAME = os.environ.get("PINECONE_INDEX_NAME", "vietnam-travel")
 PINECONE_VECTOR_DIM = int(os.environ.get("PINECONE_VECTOR_DIM", "1536"))
 
 # Optional tuning for Neo4j async driver
-# Increase this if you plan to run many concurrent fetches
-NEO4J_MAX_CONN_POOL_SIZE = 50
+# Pool size scales with the host by default; override for many concurrent fetches
+NEO4J_MAX_CONN_POOL_SIZE = int(os.environ.get(
+    "NEO4J_MAX_CONN_POOL_SIZE", max((os.cpu_count() or 4) * 10, 100)
+))
+# Seconds to wait for a free pooled connection before failing
+NEO4J_CONNECTION_ACQUISITION_TIMEOUT = float(os.environ.get("NEO4J_CONNECTION_ACQUISITION_TIMEOUT", "60"))
 
 # Enable the background async runner by default (set to False to opt out)
 ENABLE_ASYNC_RUNNER = True
 
+# Warm up the runner loop, Neo4j driver and OpenAI client in a background
+# thread when the CLI is imported, so the first question doesn't pay setup cost
+PREWARM_ON_IMPORT = os.environ.get("PREWARM_ON_IMPORT", "1") not in ("0", "false", "False")
+
 # Embedding cache settings
 # Optional Redis URL for async embedding cache (set to empty to disable)
 EMBEDDING_REDIS_URL = "" 
 # TTL for embeddings cached in Redis (seconds)
 EMBEDDING_CACHE_TTL_SECONDS = 86400 #1 day
+
+# OpenAI embedding batching (the API caps a single request at 2048 inputs)
+OPENAI_EMBED_BATCH = int(os.environ.get("OPENAI_EMBED_BATCH", "96"))
+# Parallel sub-batch requests per embed_texts call, and the account's
+# requests-per-minute limit (in-flight requests are capped at RPM/60)
+OPENAI_EMBED_CONCURRENCY = int(os.environ.get("OPENAI_EMBED_CONCURRENCY", "10"))
+OPENAI_EMBED_RPM = int(os.environ.get("OPENAI_EMBED_RPM", "3500"))
+# dtype used for embeddings stored in Redis: "float16" (half the bytes) or "float32"
+EMBEDDING_CACHE_DTYPE = os.environ.get("EMBEDDING_CACHE_DTYPE", "float16")
+
+# In-process cache of per-node graph facts (async graph fetch)
+GRAPH_CACHE_TTL_SECONDS = int(os.environ.get("GRAPH_CACHE_TTL_SECONDS", "300"))
+GRAPH_CACHE_MAX_ENTRIES = int(os.environ.get("GRAPH_CACHE_MAX_ENTRIES", "10000"))
+# Whole-result cache keyed by the exact node id tuple (same TTL as above)
+GRAPH_RESULT_CACHE_MAX_ENTRIES = int(os.environ.get("GRAPH_RESULT_CACHE_MAX_ENTRIES", "2048"))
+# Server-side timeout (seconds) for graph context queries so a slow query
+# can't hold a pooled connection indefinitely
+NEO4J_QUERY_TIMEOUT_SECONDS = float(os.environ.get("NEO4J_QUERY_TIMEOUT_SECONDS", "5"))
@@ -1,18 +1,24 @@
 """embed.py
 
-Embedding helpers and a small file cache. Provides sync and async helpers
-for creating embeddings. Async functions use aiohttp and optional Redis
-cache when configured.
+Embedding helpers and a small local cache (SQLite). Provides sync and async
+helpers for creating embeddings. Async functions use aiohttp and optional
+Redis cache when configured.
 """
 
 import hashlib
-import json
 import os
 import asyncio
-from typing import List, Optional
+import atexit
+import sqlite3
+import threading
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
 import logging
 
 import aiohttp
+import numpy as np
 try:
     import redis.asyncio as aioredis
     _AIOR= True
@@ -48,54 +54,297 @@ logger = logging.getLogger(__name__)
 # sync OpenAI client left for backward compatibility
 client = OpenAI(api_key=config.OPENAI_API_KEY)
 
-# Simple file-based cache
+# Local cache: one SQLite file (WAL mode) keyed by the raw hash bytes, with
+# embeddings stored as float32 blobs
 CACHE_DIR = os.path.join(os.path.dirname(__file__), "cache")
 os.makedirs(CACHE_DIR, exist_ok=True)
+CACHE_DB_PATH = os.path.join(CACHE_DIR, "emb.db")
+
+# Stay under SQLite's bound-parameter limit for `IN (...)` lookups
+_SQLITE_MAX_VARS = 500
+
+
+def _open_db(path: str) -> sqlite3.Connection:
+    """Open (and create if needed) the embedding cache database."""
+    db = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    db.execute("CREATE TABLE IF NOT EXISTS emb(k BLOB PRIMARY KEY, v BLOB) WITHOUT ROWID")
+    return db
+
+
+_DB = _open_db(CACHE_DB_PATH)
+# The connection is shared by the executor threads; serialize access to it
+_DB_LOCK = threading.Lock()
+
+# In-process LRU in front of SQLite so hot keys skip the database entirely.
+# Entries are read-only float32 arrays (~6 KB per 1536-dim vector, ~25 MB at
+# capacity) and callers always get a fresh list. Guarded by a thread lock
+# (not asyncio.Lock): loads and saves run in executor threads as well as on
+# the loop.
+_L1: "OrderedDict[str, np.ndarray]" = OrderedDict()
+_L1_MAX = 4096
+_L1_LOCK = threading.Lock()
+
+# Dedicated pool for cache I/O from the async paths, so cache reads/writes
+# don't compete with other run_in_executor users on the loop's default pool
+_IO_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix="embed-io")
 
 # Concurrency control for async embedding requests
 _EMBED_CONCURRENCY = getattr(config, 'EMBED_CONCURRENCY', 8)
-_SEMAPHORE = asyncio.Semaphore(_EMBED_CONCURRENCY)
+# One limiter per event loop: an asyncio.Semaphore binds to the first loop
+# that waits on it, and the runner loop and asyncio.run callers both embed
+_SEMAPHORES: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    """Return the embedding-request limiter for the running loop."""
+    loop = asyncio.get_running_loop()
+    sem = _SEMAPHORES.get(loop)
+    if sem is None:
+        sem = _SEMAPHORES.setdefault(loop, asyncio.Semaphore(_EMBED_CONCURRENCY))
+    return sem
 
 OPENAI_EMBED_URL = "https://api.openai.com/v1/embeddings"
 
+# Shared async Redis client (None when Redis caching is disabled). The
+# blocking pool caps open connections and makes callers wait for a free one.
+_REDIS = None
+if _AIOR and config.EMBEDDING_REDIS_URL:
+    _REDIS = aioredis.Redis(
+        connection_pool=aioredis.BlockingConnectionPool.from_url(
+            config.EMBEDDING_REDIS_URL, max_connections=64
+        )
+    )
+
 # Keep references to background tasks so they are not GC'd prematurely
 _BACKGROUND_TASKS: List[asyncio.Task] = []
 
+# Shared aiohttp sessions (keep-alive + DNS cache), one per event loop: a
+# session is bound to the loop it was created on, and the runner loop and
+# asyncio.run callers both embed. Guarded by a thread lock since those loops
+# live on different threads.
+_SESSIONS: Dict[asyncio.AbstractEventLoop, aiohttp.ClientSession] = {}
+_SESSIONS_LOCK = threading.Lock()
+
+
+async def _get_session() -> aiohttp.ClientSession:
+    """Return the shared OpenAI session for the running loop (create lazily)."""
+    loop = asyncio.get_running_loop()
+    with _SESSIONS_LOCK:
+        session = _SESSIONS.get(loop)
+        if session is not None and not session.closed:
+            return session
+        # drop sessions left behind by loops that have since been closed
+        stale = [(lp, s) for lp, s in _SESSIONS.items() if lp.is_closed()]
+        for lp, _ in stale:
+            del _SESSIONS[lp]
+        connector = aiohttp.TCPConnector(
+            limit=_EMBED_CONCURRENCY * 2,
+            limit_per_host=_EMBED_CONCURRENCY * 2,
+            keepalive_timeout=30,
+            ttl_dns_cache=300,
+            enable_cleanup_closed=True,
+        )
+        session = _SESSIONS[loop] = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=60),
+            headers={"Authorization": f"Bearer {config.OPENAI_API_KEY}", "Content-Type": "application/json"},
+        )
+    for _, s in stale:
+        if not s.closed:
+            await _discard_session(s)
+    return session
+
+
+async def prewarm_session() -> None:
+    """Open a pooled keep-alive connection (DNS + TLS) to the OpenAI API.
+
+    The request is a cheap model listing; its answer is ignored.
+    """
+    session = await _get_session()
+    async with session.get("https://api.openai.com/v1/models") as resp:
+        await resp.read()
+
+
+async def _discard_session(session: aiohttp.ClientSession) -> None:
+    """Drop a session whose loop is closed and close its sockets here."""
+    connector = session.connector
+    session.detach()
+    if connector is not None:
+        try:
+            await connector.close()
+        except Exception:
+            logger.debug("Failed closing stale aiohttp connector", exc_info=True)
+
+
+async def close_session() -> None:
+    """Close the running loop's shared aiohttp session, if it has one."""
+    with _SESSIONS_LOCK:
+        session = _SESSIONS.pop(asyncio.get_running_loop(), None)
+    if session is not None and not session.closed:
+        await session.close()
+
+
+def _close_session_at_exit():
+    """Best-effort close of the shared sessions on interpreter exit."""
+    with _SESSIONS_LOCK:
+        sessions = list(_SESSIONS.items())
+        _SESSIONS.clear()
+    for loop, session in sessions:
+        if session.closed or loop.is_closed():
+            continue
+        try:
+            if loop.is_running():
+                asyncio.run_coroutine_threadsafe(session.close(), loop).result(timeout=2.0)
+            else:
+                loop.run_until_complete(session.close())
+        except Exception:
+            pass
+
 
-async def _gather_and_store(tasks: List[asyncio.Task]):
-    """Gather tasks and keep a reference to prevent GC."""
-    await asyncio.gather(*tasks)
+atexit.register(_close_session_at_exit)
+
+
+def _spawn_background(coro) -> asyncio.Task:
+    """Run `coro` as a tracked background task (dropped once it finishes)."""
+    task = asyncio.create_task(coro)
+    _BACKGROUND_TASKS.append(task)
+    task.add_done_callback(_BACKGROUND_TASKS.remove)
+    return task
+
+
+async def flush() -> None:
+    """Wait for this loop's pending cache write-backs to finish.
+
+    Call before the loop ends (e.g. at the end of the coroutine passed to
+    asyncio.run), otherwise the last write-backs are cancelled.
+    """
+    loop = asyncio.get_running_loop()
+    pending = [t for t in _BACKGROUND_TASKS if t.get_loop() is loop]
+    if pending:
+        await asyncio.gather(*pending, return_exceptions=True)
+
+
+# Hashers already fed the "model:" prefix, one per model; each key copies
+# one instead of re-encoding and concatenating the prefix
+_MODEL_HASHERS: dict = {}
 
 
 def get_text_hash(text: str, model: Optional[str] = None) -> str:
-    """Return a stable SHA256 key for a text (+ optional model)."""
-    key = text if model is None else f"{model}:{text}"
-    return hashlib.sha256(key.encode()).hexdigest()
+    """Return a stable 128-bit BLAKE2b key for a text (+ optional model)."""
+    base = _MODEL_HASHERS.get(model)
+    if base is None:
+        base = hashlib.blake2b(b"" if model is None else f"{model}:".encode(), digest_size=16)
+        base = _MODEL_HASHERS.setdefault(model, base)
+    h = base.copy()
+    h.update(text.encode())
+    return h.hexdigest()
+
+
+def _to_blob(embedding) -> bytes:
+    return np.asarray(embedding, dtype=np.float32).tobytes()
+
+
+def _from_blob(blob: bytes) -> List[float]:
+    return np.frombuffer(blob, dtype=np.float32).tolist()
 
 
-def _cache_path(hash_key: str) -> str:
-    return os.path.join(CACHE_DIR, f"{hash_key}.json")
+def _l1_get(hash_key: str) -> Optional[List[float]]:
+    with _L1_LOCK:
+        v = _L1.get(hash_key)
+        if v is None:
+            return None
+        _L1.move_to_end(hash_key)
+    return v.tolist()
+
+
+def _l1_put_many(items) -> None:
+    """Store (hash_key, vector) pairs; vectors may be lists, arrays or read-only
+    float32 arrays straight from a blob."""
+    rows = []
+    for hk, emb in items:
+        arr = emb if isinstance(emb, np.ndarray) and not emb.flags.writeable else np.array(emb, dtype=np.float32)
+        arr.flags.writeable = False
+        rows.append((hk, arr))
+    with _L1_LOCK:
+        for hk, arr in rows:
+            _L1[hk] = arr
+            _L1.move_to_end(hk)
+        while len(_L1) > _L1_MAX:
+            _L1.popitem(last=False)
 
 
 def load_cache(hash_key: str) -> Optional[List[float]]:
-    """Return cached embedding or None if missing/corrupt."""
-    cache_file = _cache_path(hash_key)
-    if os.path.exists(cache_file):
-        with open(cache_file, 'r', encoding='utf-8') as f:
-            try:
-                return json.load(f)
-            except Exception:
-                logger.exception("Failed parsing cache file %s", cache_file)
-    return None
+    """Return cached embedding or None if missing/unreadable."""
+    cached = _l1_get(hash_key)
+    if cached is not None:
+        return cached
+    try:
+        with _DB_LOCK:
+            row = _DB.execute("SELECT v FROM emb WHERE k=?", (bytes.fromhex(hash_key),)).fetchone()
+    except sqlite3.Error:
+        logger.exception("Failed reading cache entry %s", hash_key)
+        return None
+    if not row:
+        return None
+    arr = np.frombuffer(row[0], dtype=np.float32)
+    _l1_put_many([(hash_key, arr)])
+    return arr.tolist()
+
+
+def load_many(hash_keys: List[str]) -> List[Optional[List[float]]]:
+    """Return cached embeddings for several keys (None for misses), in order."""
+    found = {}
+    with _L1_LOCK:
+        for hk in hash_keys:
+            v = _L1.get(hk)
+            if v is not None:
+                _L1.move_to_end(hk)
+                found[hk] = v
+    found = {hk: v.tolist() for hk, v in found.items()}
+    misses = [hk for hk in hash_keys if hk not in found]
+    loaded = []
+    try:
+        with _DB_LOCK:
+            for start in range(0, len(misses), _SQLITE_MAX_VARS):
+                chunk = [bytes.fromhex(hk) for hk in misses[start:start + _SQLITE_MAX_VARS]]
+                placeholders = ",".join("?" * len(chunk))
+                for k, v in _DB.execute(f"SELECT k, v FROM emb WHERE k IN ({placeholders})", chunk):
+                    loaded.append((k.hex(), np.frombuffer(v, dtype=np.float32)))
+    except sqlite3.Error:
+        logger.exception("Failed reading cache entries")
+        return [found.get(hk) for hk in hash_keys]
+    if loaded:
+        _l1_put_many(loaded)
+        found.update((hk, arr.tolist()) for hk, arr in loaded)
+    return [found.get(hk) for hk in hash_keys]
 
 
 def save_cache(hash_key: str, embedding: List[float]):
-    """Atomically write an embedding to the file cache."""
-    cache_file = _cache_path(hash_key)
-    tmp = cache_file + ".tmp"
-    with open(tmp, 'w', encoding='utf-8') as f:
-        json.dump(embedding, f)
-    os.replace(tmp, cache_file)
+    """Write an embedding to the local cache."""
+    with _DB_LOCK:
+        _DB.execute(
+            "INSERT OR REPLACE INTO emb(k, v) VALUES (?, ?)",
+            (bytes.fromhex(hash_key), _to_blob(embedding)),
+        )
+    _l1_put_many([(hash_key, embedding)])
+
+
+def save_many(items: List[tuple]):
+    """Write several (hash_key, embedding) pairs in a single transaction."""
+    rows = [(bytes.fromhex(hk), _to_blob(emb)) for hk, emb in items]
+    if not rows:
+        return
+    with _DB_LOCK:
+        _DB.execute("BEGIN")
+        try:
+            _DB.executemany("INSERT OR REPLACE INTO emb(k, v) VALUES (?, ?)", rows)
+        except Exception:
+            _DB.execute("ROLLBACK")
+            raise
+        _DB.execute("COMMIT")
+    _l1_put_many(items)
 
 
 def embed_text(text: str, model: str = "text-embedding-3-small", use_cache: bool = True) -> List[float]:
@@ -119,26 +368,29 @@ def embed_texts(texts: List[str], model: str = "text-embedding-3-small", batch_s
     """Batch sync embedding with optional file-cache support."""
     def _process_batch(batch_texts: List[str]):
         batch_embeddings_local = [None] * len(batch_texts)
-        uncached_texts_local = []
-        uncached_indices_local = []
+        # uncached text -> its indices in the batch, so duplicates are embedded once
+        uncached_local: Dict[str, List[int]] = {}
+        hash_keys = [get_text_hash(text, model=model) for text in batch_texts] if use_cache else []
+        # one lookup for the whole batch
+        cached_vals = load_many(hash_keys) if use_cache else [None] * len(batch_texts)
         for j, text in enumerate(batch_texts):
-            if use_cache:
-                hash_key = get_text_hash(text, model=model)
-                cached = load_cache(hash_key)
-                if cached is not None:
-                    batch_embeddings_local[j] = cached
-                    continue
-            uncached_texts_local.append(text)
-            uncached_indices_local.append(j)
-
-        if uncached_texts_local:
+            if cached_vals[j] is not None:
+                batch_embeddings_local[j] = cached_vals[j]
+                continue
+            uncached_local.setdefault(text, []).append(j)
+
+        if uncached_local:
+            uncached_texts_local = list(uncached_local)
             resp = client.embeddings.create(model=model, input=uncached_texts_local)
-            for k, emb in enumerate(resp.data):
-                original_idx = uncached_indices_local[k]
-                batch_embeddings_local[original_idx] = emb.embedding
+            to_save = []
+            for text, emb in zip(uncached_texts_local, resp.data):
+                indices = uncached_local[text]
+                for original_idx in indices:
+                    batch_embeddings_local[original_idx] = emb.embedding
                 if use_cache:
-                    hash_key = get_text_hash(uncached_texts_local[k], model=model)
-                    save_cache(hash_key, emb.embedding)
+                    to_save.append((hash_keys[indices[0]], emb.embedding))
+            # one transaction for the whole batch
+            save_many(to_save)
 
         return batch_embeddings_local
 
@@ -156,52 +408,115 @@ def embed_texts(texts: List[str], model: str = "text-embedding-3-small", batch_s
 async def _load_cache_async(hash_key: str) -> Optional[List[float]]:
     """Load cache using a thread executor to avoid blocking the loop."""
     loop = asyncio.get_running_loop()
-    return await loop.run_in_executor(None, load_cache, hash_key)
+    return await loop.run_in_executor(_IO_POOL, load_cache, hash_key)
 
 
 async def _save_cache_async(hash_key: str, embedding: List[float]):
     """Save cache entry without blocking the event loop."""
     loop = asyncio.get_running_loop()
-    await loop.run_in_executor(None, save_cache, hash_key, embedding)
+    await loop.run_in_executor(_IO_POOL, save_cache, hash_key, embedding)
+
+
+async def _load_many_async(hash_keys: List[str]) -> List[Optional[List[float]]]:
+    """Load a whole batch of cache entries with one executor call."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_IO_POOL, load_many, hash_keys)
+
+
+async def _save_many_async(items: List[tuple]):
+    """Save a whole batch of (hash_key, embedding) pairs with one executor call."""
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(_IO_POOL, save_many, items)
+
+
+def _redis_key(hash_key: str) -> str:
+    # Values are float32 blobs; the prefix keeps them apart from the older
+    # JSON-encoded entries stored under the bare hash.
+    return f"f32:{hash_key}"
+
+
+async def _redis_get_many(hash_keys: List[str]) -> List[Optional[List[float]]]:
+    """MGET several cache keys in one round-trip; errors count as misses."""
+    try:
+        raw_list = await _REDIS.mget([_redis_key(hk) for hk in hash_keys])
+    except Exception:
+        logger.exception("Redis cache read failed")
+        return [None] * len(hash_keys)
+    return [_from_blob(raw) if raw else None for raw in raw_list]
+
+
+async def _redis_set_many(items: List[tuple]):
+    """Write (hash_key, embedding) pairs with a single pipelined round-trip."""
+    try:
+        pipe = _REDIS.pipeline(transaction=False)
+        for hk, emb in items:
+            pipe.set(_redis_key(hk), _to_blob(emb), ex=config.EMBEDDING_CACHE_TTL_SECONDS)
+        await pipe.execute()
+    except Exception:
+        logger.exception("Redis cache write failed")
+
+
+async def _write_local(items: List[tuple]):
+    """Persist (hash_key, embedding) pairs to the SQLite cache (and the L1)."""
+    try:
+        await _save_many_async(items)
+    except Exception:
+        logger.exception("Local cache write failed")
+
+
+async def _write_back(items: List[tuple]):
+    """Persist freshly embedded (hash_key, embedding) pairs to every cache tier."""
+    await _write_local(items)
+    if _REDIS is not None:
+        await _redis_set_many(items)
+
+
+def _promote_redis_hits(items: List[tuple]) -> None:
+    """Copy Redis hits into the local tiers so the next lookup stays in-process."""
+    _l1_put_many(items)
+    _spawn_background(_write_local(items))
 
 
 @retry(reraise=True, stop=stop_after_attempt(3), wait=wait_exponential(min=1, max=10), retry=retry_if_exception_type(Exception))
-async def _fetch_embeddings_aiohttp(texts: List[str], model: str):
-    """Call OpenAI embeddings endpoint and return the embeddings list."""
-    headers = {"Authorization": f"Bearer {config.OPENAI_API_KEY}", "Content-Type": "application/json"}
+async def _fetch_embeddings_aiohttp(texts: List[str], model: str, return_ndarray: bool = False):
+    """Call OpenAI embeddings endpoint and return the embeddings list.
+
+    With `return_ndarray=True` the result is a (len(texts), dim) float32 array.
+    """
     payload = {"model": model, "input": texts}
-    timeout = aiohttp.ClientTimeout(total=60)
-    async with aiohttp.ClientSession(timeout=timeout) as session:
-        async with session.post(OPENAI_EMBED_URL, headers=headers, json=payload) as resp:
-            resp.raise_for_status()
-            data = await resp.json()
-            return [it.get('embedding') for it in data.get('data', [])]
+    session = await _get_session()
+    async with session.post(OPENAI_EMBED_URL, json=payload) as resp:
+        resp.raise_for_status()
+        data = await resp.json()
+        embeddings = [it.get('embedding') for it in data.get('data', [])]
+        return np.asarray(embeddings, dtype=np.float32) if return_ndarray else embeddings
 
 
 async def async_embed_text(text: str, model: str = "text-embedding-3-small", use_cache: bool = True) -> List[float]:
     """Return embedding for a single text. Uses cache if enabled."""
     hash_key = get_text_hash(text, model=model)
     if use_cache:
-        cached = await _load_cache_async(hash_key)
+        # hot keys are answered from the in-process LRU without an executor hop
+        cached = _l1_get(hash_key)
+        if cached is None:
+            cached = await _load_cache_async(hash_key)
         if cached is not None:
             return cached
 
     # Try Redis cache first (async) if configured
-    if use_cache and _AIOR and config.EMBEDDING_REDIS_URL:
+    if use_cache and _REDIS is not None:
         try:
-            redis = aioredis.from_url(config.EMBEDDING_REDIS_URL)
-            cached_raw = await redis.get(hash_key)
+            cached_raw = await _REDIS.get(_redis_key(hash_key))
             if cached_raw:
-                return json.loads(cached_raw)
+                cached = _from_blob(cached_raw)
+                _promote_redis_hits([(hash_key, cached)])
+                return cached
         except Exception:
             logger.exception("Redis cache read failed")
 
     # Acquire semaphore to limit concurrent remote calls
-    await _SEMAPHORE.acquire()
-    try:
+    async with _get_semaphore():
         embeddings = await _fetch_embeddings_aiohttp([text], model)
-    finally:
-        _SEMAPHORE.release()
 
     if not embeddings:
         raise RuntimeError("No embedding returned from OpenAI")
@@ -211,40 +526,40 @@ async def async_embed_text(text: str, model: str = "text-embedding-3-small", use
         # Save to file cache in background
         await _save_cache_async(hash_key, embedding)
         # Also save to Redis if enabled
-        if _AIOR and config.EMBEDDING_REDIS_URL:
+        if _REDIS is not None:
             try:
-                redis = aioredis.from_url(config.EMBEDDING_REDIS_URL)
-                await redis.set(hash_key, json.dumps(embedding), ex=config.EMBEDDING_CACHE_TTL_SECONDS)
+                await _REDIS.set(_redis_key(hash_key), _to_blob(embedding), ex=config.EMBEDDING_CACHE_TTL_SECONDS)
             except Exception:
                 logger.exception("Redis cache write failed")
     return embedding
 
 
-async def async_embed_texts(texts: List[str], model: str = "text-embedding-3-small", batch_size: int = 32, use_cache: bool = True) -> List[List[float]]:
-    """Batch async embedding with caching and concurrency control."""
-    results: List[Optional[List[float]]] = [None] * len(texts)
+async def async_embed_texts(texts: List[str], model: str = "text-embedding-3-small", batch_size: int = 32, use_cache: bool = True, as_array: bool = False):
+    """Batch async embedding with caching and concurrency control.
 
-    # 1. Check cache for each text
-    tasks = []
+    Returns a list of embeddings, or with `as_array=True` a float32 array
+    of shape (len(texts), dim).
+    """
+    # Embed each distinct text once; results are fanned back out by index
+    positions: Dict[str, List[int]] = {}
     for i, t in enumerate(texts):
-        if use_cache:
-            hk = get_text_hash(t, model=model)
-            tasks.append((_load_cache_async(hk), i, t, hk))
-        else:
-            tasks.append((None, i, t, get_text_hash(t, model=model)))
-
-    async def _map_loaded_caches(tasks_list):
-        """Load caches concurrently and populate results; return uncached lists."""
-        coros_with_index = [(entry[0], entry[1], entry[2]) for entry in tasks_list if entry[0] is not None]
-        if not coros_with_index:
-            # no cache coros, all texts are uncached
-            return [entry[2] for entry in tasks_list], [entry[1] for entry in tasks_list]
-
-        coros = [c[0] for c in coros_with_index]
-        loaded_vals = await asyncio.gather(*coros)
+        positions.setdefault(get_text_hash(t, model=model), []).append(i)
+    unique_keys = list(positions)
+    unique_texts = [texts[idxs[0]] for idxs in positions.values()]
+    results: List[Optional[List[float]]] = [None] * len(unique_texts)
+    # Fresh (hash_key, embedding) pairs from every batch, written back once
+    pending_writes: List[tuple] = []
+
+    async def _map_loaded_caches():
+        """Load cached entries in one executor call; return uncached lists."""
+        if not use_cache:
+            # cache disabled, all texts are uncached
+            return list(unique_texts), list(range(len(unique_texts)))
+
+        loaded_vals = await _load_many_async(unique_keys)
         unc_texts_local = []
         unc_indices_local = []
-        for v, (_, idx, text) in zip(loaded_vals, coros_with_index):
+        for idx, (v, text) in enumerate(zip(loaded_vals, unique_texts)):
             if v is not None:
                 results[idx] = v
             else:
@@ -254,58 +569,77 @@ async def async_embed_texts(texts: List[str], model: str = "text-embedding-3-sma
 
     async def _embed_batches_and_cache(unc_texts, unc_indices):
         """Embed uncached texts in batches, populate results, schedule cache writes."""
-        for start in range(0, len(unc_texts), batch_size):
-            batch = unc_texts[start:start + batch_size]
-            await _SEMAPHORE.acquire()
+        starts = list(range(0, len(unc_texts), batch_size))
+        sem = _get_semaphore()
+        if hasattr(asyncio, "TaskGroup"):
+            # acquire before creating each task, so at most _EMBED_CONCURRENCY
+            # batches (and their payloads) are in flight at any time
             try:
-                    embeddings = await _fetch_embeddings_aiohttp(batch, model)
-            finally:
-                _SEMAPHORE.release()
-
-            bg_tasks = []
-            for k, emb in enumerate(embeddings):
-                orig_idx = unc_indices[start + k]
-                results[orig_idx] = emb
-                if use_cache:
-                    hk = get_text_hash(batch[k], model=model)
-                    bg = asyncio.create_task(_save_cache_async(hk, emb))
-                    bg_tasks.append(bg)
+                async with asyncio.TaskGroup() as tg:
+                    for start in starts:
+                        await sem.acquire()
+                        task = tg.create_task(_embed_one_batch(unc_texts, unc_indices, start))
+                        task.add_done_callback(lambda _t: sem.release())
+            except BaseExceptionGroup as eg:
+                # surface the first batch error itself (e.g. ClientResponseError),
+                # same as the gather path below, not an ExceptionGroup
+                raise eg.exceptions[0] from None
+        else:
+            # Python < 3.11: gather in chunks of the same size
+            async def _bounded(start):
+                async with sem:
+                    await _embed_one_batch(unc_texts, unc_indices, start)
 
-            if bg_tasks:
-                # keep a reference to the background gather task so it is not GC'd
-                gather_task = asyncio.create_task(asyncio.gather(*bg_tasks))
-                _BACKGROUND_TASKS.append(gather_task)
+            for i in range(0, len(starts), _EMBED_CONCURRENCY):
+                await asyncio.gather(*(_bounded(st) for st in starts[i:i + _EMBED_CONCURRENCY]))
 
-    uncached_texts, uncached_indices = await _map_loaded_caches(tasks)
-    # if there are uncached items, embed them
-    if uncached_texts:
-        await _embed_batches_and_cache(uncached_texts, uncached_indices)
+    async def _embed_one_batch(unc_texts, unc_indices, start):
+        """Embed one batch, populate results and queue its cache writes."""
+        batch = unc_texts[start:start + batch_size]
+        embeddings = await _fetch_embeddings_aiohttp(batch, model, return_ndarray=as_array)
 
-    # 2. For uncached texts, call OpenAI in batches
-    for start in range(0, len(uncached_texts), batch_size):
-        batch = uncached_texts[start:start + batch_size]
-        # acquire semaphore (limit concurrent HTTP calls)
-        await _SEMAPHORE.acquire()
-        try:
-                embeddings = await _fetch_embeddings_aiohttp(batch, model)
-        finally:
-            _SEMAPHORE.release()
-
-        # assign and optionally cache
-        background_tasks = []
         for k, emb in enumerate(embeddings):
-            orig_idx = uncached_indices[start + k]
+            orig_idx = unc_indices[start + k]
             results[orig_idx] = emb
             if use_cache:
-                hk = get_text_hash(batch[k], model=model)
-                # save in background to avoid blocking; track tasks to prevent GC
-                bg = asyncio.create_task(_save_cache_async(hk, emb))
-                background_tasks.append(bg)
+                pending_writes.append((unique_keys[orig_idx], emb))
+
+    uncached_texts, uncached_indices = await _map_loaded_caches()
+
+    # Probe Redis for the file-cache misses with a single MGET
+    if use_cache and _REDIS is not None and uncached_texts:
+        redis_vals = await _redis_get_many([unique_keys[i] for i in uncached_indices])
+        still_texts, still_indices = [], []
+        redis_hits: List[tuple] = []
+        for v, t, idx in zip(redis_vals, uncached_texts, uncached_indices):
+            if v is not None:
+                results[idx] = v
+                redis_hits.append((unique_keys[idx], v))
+            else:
+                still_texts.append(t)
+                still_indices.append(idx)
+        uncached_texts, uncached_indices = still_texts, still_indices
+        if redis_hits:
+            _promote_redis_hits(redis_hits)
+
+    # if there are uncached items, embed them
+    if uncached_texts:
+        await _embed_batches_and_cache(uncached_texts, uncached_indices)
 
-        # if we scheduled background cache writes, await them in background
-        if background_tasks:
-            # schedule completion but don't block primary flow
-            asyncio.create_task(asyncio.gather(*background_tasks))
+    if pending_writes:
+        # a single background task (one transaction, one pipeline) per call
+        _spawn_background(_write_back(pending_writes))
 
     # All results should be filled
-    return list(results)
+    if as_array:
+        dim = len(results[0]) if results else config.PINECONE_VECTOR_DIM
+        arr = np.empty((len(texts), dim), dtype=np.float32)
+        for emb, idxs in zip(results, positions.values()):
+            arr[idxs] = emb
+        return arr
+
+    out: List[Optional[List[float]]] = [None] * len(texts)
+    for emb, idxs in zip(results, positions.values()):
+        for i in idxs:
+            out[i] = emb
+    return out
@@ -4,7 +4,9 @@
 Contains functions to fetch neighbors and upsert nodes/relationships.
 """
 
-from typing import List, Dict, Any
+from collections import defaultdict
+from itertools import zip_longest
+from typing import List, Dict, Any, Tuple
 from neo4j import GraphDatabase
 import config
 
@@ -14,42 +16,85 @@ driver = GraphDatabase.driver(
 )
 
 
+# Per-source caps for the two-phase fetch: neighbours per seed node, then
+# second-hop nodes per neighbour
+HOP1_LIMIT = 5
+HOP2_LIMIT = 10
+
+
+def _round_robin(groups: List[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """Interleave lists: the first item of each, then the second of each, ..."""
+    return [item for row in zip_longest(*groups) for item in row if item is not None]
+
+
 def fetch_graph_context(node_ids: List[str]) -> List[Dict[str, Any]]:
     """Return 1- and 2-hop neighbors for the given node ids."""
     facts = []
     with driver.session() as session:
-        # Use UNWIND for efficient batch query, include 2-hop
-        query = (
+        # Phase 1: neighbours of each seed, capped per seed so one popular
+        # node can't crowd out the others. Descriptions are truncated and
+        # duplicate rows dropped server-side.
+        hop1_query = (
             "UNWIND $node_ids AS nid "
+            "CALL { WITH nid "
             "MATCH (n:Entity {id: nid})-[r]-(m:Entity) "
-            "OPTIONAL MATCH (m)-[r2]-(o:Entity) WHERE o <> n "
-            "RETURN type(r) AS rel, labels(m) AS labels, m.id AS id, "
-            "m.name AS name, m.type AS type, m.description AS description, "
-            "type(r2) AS rel2, labels(o) AS labels2, o.id AS id2, "
-            "o.name AS name2, o.type AS type2, o.description AS description2 "
-            "LIMIT 100"
+            "WITH DISTINCT type(r) AS rel, m "
+            "RETURN rel, m LIMIT $k1 } "
+            "RETURN nid, rel, labels(m) AS labels, m.id AS id, m.name AS name, "
+            "substring(coalesce(m.description, ''), 0, 400) AS description"
+        )
+        hop1 = list(session.run(hop1_query, node_ids=node_ids, k1=HOP1_LIMIT))
+        if not hop1:
+            return facts
+
+        # Phase 2: one batched query for the second hop of every
+        # (seed, neighbour) pair, excluding the seed itself
+        pairs = list({(r["nid"], r["id"]): None for r in hop1})
+        hop2_query = (
+            "UNWIND $pairs AS pair "
+            "CALL { WITH pair "
+            "MATCH (m:Entity {id: pair.mid})-[r2]-(o:Entity) WHERE o.id <> pair.src "
+            "WITH DISTINCT type(r2) AS rel2, o "
+            "RETURN rel2, o LIMIT $k2 } "
+            "RETURN pair.src AS src, pair.mid AS mid, rel2, labels(o) AS labels2, o.id AS id2, "
+            "o.name AS name2, substring(coalesce(o.description, ''), 0, 400) AS description2"
         )
-        recs = session.run(query, node_ids=node_ids)
-        for r in recs:
-            # 1-hop fact
-            facts.append({
+        hop2: Dict[Tuple[str, str], List[Any]] = defaultdict(list)
+        for r in session.run(hop2_query, pairs=[{"src": src, "mid": mid} for src, mid in pairs], k2=HOP2_LIMIT):
+            hop2[(r["src"], r["mid"])].append(r)
+
+    # Collect facts per seed, then interleave them so the 50-fact cap is
+    # shared: every seed's 1-hop facts come first (round-robin), then the
+    # 2-hop facts (round-robin)
+    hop1_by_seed: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    hop2_by_seed: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    seen_hop1 = set()
+    for r in hop1:
+        # 1-hop fact (once per neighbor, even if several seeds reach it)
+        if (r["id"], r["rel"]) not in seen_hop1:
+            seen_hop1.add((r["id"], r["rel"]))
+            hop1_by_seed[r["nid"]].append({
                 "source": None,
                 "rel": r["rel"],
                 "target_id": r["id"],
                 "target_name": r["name"],
-                "target_desc": (r["description"] or "")[:400],
+                "target_desc": r["description"],
                 "labels": r["labels"]
             })
-            # 2-hop fact if exists
-            if r["rel2"]:
-                facts.append({
-                    "source": r["id"],  # From the 1-hop node
-                    "rel": r["rel2"],
-                    "target_id": r["id2"],
-                    "target_name": r["name2"],
-                    "target_desc": (r["description2"] or "")[:400],
-                    "labels": r["labels2"]
-                })
+        # 2-hop facts reached through this neighbour (each pair only once)
+        for r2 in hop2.pop((r["nid"], r["id"]), []):
+            hop2_by_seed[r["nid"]].append({
+                "source": r["id"],  # From the 1-hop node
+                "rel": r2["rel2"],
+                "target_id": r2["id2"],
+                "target_name": r2["name2"],
+                "target_desc": r2["description2"],
+                "labels": r2["labels2"]
+            })
+
+    seeds = list(dict.fromkeys(node_ids))
+    facts = _round_robin([hop1_by_seed[nid] for nid in seeds])
+    facts += _round_robin([hop2_by_seed[nid] for nid in seeds])
     return facts[:50]  # Limit to 50 total
 
 def create_constraints():
@@ -83,16 +128,62 @@ def create_relationship(source_id: str, rel: Dict[str, Any]):
         session.run(cypher, source_id=source_id, target_id=target_id)
 
 
-def fetch_graph_context_async_wrapper(node_ids: List[str]):
-    """Run async fetcher from sync code (uses asyncio.run)."""
+# Rows sent per UNWIND statement by the bulk loaders
+WRITE_BATCH = 1000
+
+
+def upsert_nodes(nodes: List[Dict[str, Any]], batch_size: int = WRITE_BATCH):
+    """Merge many nodes with one UNWIND statement per label and chunk."""
+    by_label: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for node in nodes:
+        props = {k: v for k, v in node.items() if k not in ("connections",)}
+        by_label[node.get("type", "Unknown")].append({"id": node["id"], "props": props})
+    # Labels can't be parameters, so rows are grouped per label instead of
+    # relying on APOC's dynamic-label procedures
+    with driver.session() as session:
+        for label, rows in by_label.items():
+            cypher = f"UNWIND $rows AS row MERGE (n:{label}:Entity {{id: row.id}}) SET n += row.props"
+            for start in range(0, len(rows), batch_size):
+                session.run(cypher, rows=rows[start:start + batch_size]).consume()
+
+
+def create_relationships(rels: List[Tuple[str, Dict[str, Any]]], batch_size: int = WRITE_BATCH):
+    """Create many (source_id, rel) relationships, one UNWIND per type and chunk."""
+    by_type: Dict[str, List[Dict[str, str]]] = defaultdict(list)
+    for source_id, rel in rels:
+        target_id = rel.get("target")
+        if not target_id:
+            continue
+        by_type[rel.get("relation", "RELATED_TO")].append({"src": source_id, "dst": target_id})
+    with driver.session() as session:
+        for rel_type, rows in by_type.items():
+            cypher = (
+                "UNWIND $rows AS row "
+                "MATCH (a:Entity {id: row.src}), (b:Entity {id: row.dst}) "
+                f"MERGE (a)-[r:{rel_type}]->(b)"
+            )
+            for start in range(0, len(rows), batch_size):
+                session.run(cypher, rows=rows[start:start + batch_size]).consume()
+
+
+def fetch_graph_context_async_wrapper(node_ids: List[str], use_cache: bool = True):
+    """Run async fetcher from sync code.
+
+    Kept for existing callers; same as `fetch_graph_context_via_runner`.
+    Only when the runner is disabled does it fall back to `asyncio.run`,
+    which builds a new loop and driver on every call.
+    """
+    if config.ENABLE_ASYNC_RUNNER:
+        return fetch_graph_context_via_runner(node_ids, use_cache=use_cache)
+
     import asyncio
     from async_graph import fetch_graph_context_async
 
-    return asyncio.run(fetch_graph_context_async(node_ids))
+    return asyncio.run(fetch_graph_context_async(node_ids, use_cache=use_cache))
 
 
-def fetch_graph_context_via_runner(node_ids: List[str]):
+def fetch_graph_context_via_runner(node_ids: List[str], use_cache: bool = True):
     """Submit the async fetch to the background runner and wait for result."""
     from async_graph import submit_fetch_graph
 
-    return submit_fetch_graph(node_ids)
\ No newline at end of file
+    return submit_fetch_graph(node_ids, use_cache=use_cache)
\ No newline at end of file
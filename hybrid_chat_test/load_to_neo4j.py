@@ -1,7 +1,6 @@
 # load_to_neo4j.py
 import json
-from tqdm import tqdm
-from graph import create_constraints, upsert_node, create_relationship
+from graph import create_constraints, upsert_nodes, create_relationships
 import config
 
 DATA_FILE = "vietnam_travel_dataset.json"
@@ -13,15 +12,14 @@ def main():
     # Create constraints
     create_constraints()
 
-    # Upsert all nodes
-    for node in tqdm(nodes, desc="Creating nodes"):
-        upsert_node(node)
+    # Upsert all nodes (batched UNWIND per label)
+    print(f"Creating {len(nodes)} nodes...")
+    upsert_nodes(nodes)
 
-    # Create relationships
-    for node in tqdm(nodes, desc="Creating relationships"):
-        conns = node.get("connections", [])
-        for rel in conns:
-            create_relationship(node["id"], rel)
+    # Create relationships (batched UNWIND per relationship type)
+    rels = [(node["id"], rel) for node in nodes for rel in node.get("connections", [])]
+    print(f"Creating {len(rels)} relationships...")
+    create_relationships(rels)
 
     print("Done loading into Neo4j.")
 
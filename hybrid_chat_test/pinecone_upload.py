@@ -1,9 +1,10 @@
 # pinecone_upload.py
+import asyncio
 import json
-import time
+import math
 from tqdm import tqdm
-from embed import embed_texts
-from vector_search import create_index_if_not_exists, upsert_vectors
+from embed import async_embed_texts, close_session, flush
+from vector_search import create_index_if_not_exists, async_upsert_vectors
 import config
 
 # -----------------------------
@@ -11,11 +12,39 @@ import config
 # -----------------------------
 DATA_FILE = "vietnam_travel_dataset.json"
 BATCH_SIZE = 32
+# Batches embedded per producer step (sent to OpenAI concurrently)
+IN_FLIGHT = getattr(config, "EMBED_CONCURRENCY", 8)
 
 # -----------------------------
 # Main upload
 # -----------------------------
-def main():
+async def embed_batches(items, queue):
+    """Producer: embed IN_FLIGHT batches per call and queue them for upsert."""
+    for chunk in chunked(items, BATCH_SIZE * IN_FLIGHT):
+        # the sub-batches of one call are sent to OpenAI concurrently
+        embeddings = await async_embed_texts(
+            [item[1] for item in chunk], model="text-embedding-3-small", batch_size=BATCH_SIZE, use_cache=True,
+            as_array=True,
+        )
+        for batch, batch_embeddings in zip(chunked(chunk, BATCH_SIZE), chunked(embeddings, BATCH_SIZE)):
+            vectors = [
+                {"id": _id, "values": emb.tolist(), "metadata": meta}
+                for (_id, _, meta), emb in zip(batch, batch_embeddings)
+            ]
+            await queue.put(vectors)
+    await queue.put(None)
+
+async def upsert_batches(queue, progress):
+    """Consumer: upsert queued batches while the producer embeds the next ones."""
+    while True:
+        vectors = await queue.get()
+        if vectors is None:
+            break
+        # 429s and 5xx errors are retried with backoff inside the upsert
+        await async_upsert_vectors(vectors)
+        progress.update(1)
+
+async def main_async():
     with open(DATA_FILE, "r", encoding="utf-8") as f:
         nodes = json.load(f)
 
@@ -38,23 +67,24 @@ def main():
     # Create index if needed
     create_index_if_not_exists()
 
-    for batch in tqdm(list(chunked(items, BATCH_SIZE)), desc="Uploading batches"):
-        ids = [item[0] for item in batch]
-        texts = [item[1] for item in batch]
-        metas = [item[2] for item in batch]
-
-        embeddings = embed_texts(texts, model="text-embedding-3-small", use_cache=True)
-
-        vectors = [
-            {"id": _id, "values": emb, "metadata": meta}
-            for _id, emb, meta in zip(ids, embeddings, metas)
-        ]
-
-        upsert_vectors(vectors)
-        time.sleep(0.2)
+    # Two-stage pipeline; the small queue keeps embedding at most a couple
+    # of batches ahead of the upserts
+    queue = asyncio.Queue(maxsize=2)
+    try:
+        with tqdm(total=math.ceil(len(items) / BATCH_SIZE), desc="Uploading batches") as progress:
+            await asyncio.gather(embed_batches(items, queue), upsert_batches(queue, progress))
+    finally:
+        # asyncio.run cancels leftover tasks and closes the loop before atexit
+        # hooks run, so the last cache write-backs are awaited and the shared
+        # OpenAI session is closed here
+        await flush()
+        await close_session()
 
     print("All items uploaded successfully.")
 
+def main():
+    asyncio.run(main_async())
+
 def chunked(iterable, n):
     for i in range(0, len(iterable), n):
         yield iterable[i:i+n]
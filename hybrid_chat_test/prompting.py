@@ -5,16 +5,29 @@ sanitization and citation expansion helpers. This is a stable, minimal
 implementation used by the CLI.
 """
 from typing import List, Dict, Any
+import asyncio
+import heapq
 import re
-from openai import OpenAI
-import config
+from adapters.openai_adapter import create_client
 
-client = OpenAI(api_key=config.OPENAI_API_KEY)
+client = create_client()
+
+# Compiled once; the score and both node_id citation forms are stripped in
+# a single pass
+_STRIP_RE = re.compile(
+    r"score:\s*\d+\.\d+|\[\s*node_id\s*:\s*[^\]]+\]|\(\s*node_id\s*:\s*[^\)]+\)",
+    re.IGNORECASE,
+)
+_WS_RE = re.compile(r" {2,}")
+_META_RE = re.compile(r"\s*(Note:|Validation:)")
+_CITATION_RE = re.compile(r"\[\s*([^\]]+)\s*\]")
+_CITATION_ID_RE = re.compile(r"(?:(?:node[_ ]?id|nodeid|id)\s*:\s*)?(?P<id>[A-Za-z0-9_-]+)", re.IGNORECASE)
 
 
 def search_summary(pinecone_matches: List[Dict[str, Any]], graph_facts: List[Dict[str, Any]]) -> str:
+    # matches arrive already ordered by score (see build_prompt)
     vec_snippets = []
-    for m in sorted(pinecone_matches, key=lambda x: x.get('score', 0), reverse=True)[:5]:
+    for m in pinecone_matches[:5]:
         meta = m.get('metadata', {})
         score = m.get('score', 0)
         vec_snippets.append(f"- {meta.get('name','Unknown')}: {meta.get('type','Unknown')} (tags: {', '.join(meta.get('tags', []))}, score: {score:.2f})")
@@ -43,13 +56,16 @@ def build_prompt(user_query: str, pinecone_matches: List[Dict[str, Any]], graph_
 
     system = template["system"] + " " + template["suffix"]
 
+    # top 10 by score, selected once and shared with the summary
+    top = heapq.nlargest(10, pinecone_matches, key=lambda x: x.get('score', 0))
+
     vec_context = []
-    for m in pinecone_matches[:10]:
+    for m in top:
         meta = m.get('metadata', {})
         vec_context.append(f"- id: {m.get('id')}, name: {meta.get('name','')}, type: {meta.get('type','')}, score: {m.get('score')}")
 
     graph_context = [f"- ({f.get('source')}) -[{f.get('rel')}]-> ({f.get('target_id')}) {f.get('target_name')}: {f.get('target_desc')}" for f in graph_facts[:15]]
-    summary = search_summary(pinecone_matches, graph_facts)
+    summary = search_summary(top, graph_facts)
 
     user_content = "User query: " + user_query + "\n\n"
     user_content += "Preferences: " + str(preferences) + "\n\n"
@@ -72,6 +88,11 @@ def call_chat(prompt_messages: List[Dict[str, str]], max_tokens: int = 1000) ->
     return resp.choices[0].message.content
 
 
+async def async_call_chat(prompt_messages: List[Dict[str, str]], max_tokens: int = 1000) -> str:
+    """Run `call_chat` in a worker thread so the event loop stays free."""
+    return await asyncio.to_thread(call_chat, prompt_messages, max_tokens)
+
+
 def validate_response(response: str, trip_length: int) -> str:
     if f"Day {trip_length}" not in response:
         return f"Response incomplete: Missing Day {trip_length}."
@@ -79,12 +100,9 @@ def validate_response(response: str, trip_length: int) -> str:
 
 
 def sanitize_answer(response: str) -> str:
-    response = re.sub(r"score:\s*\d+\.\d+", "", response, flags=re.IGNORECASE)
-    response = re.sub(r"\[\s*node_id\s*:\s*[^\]]+\]", "", response, flags=re.IGNORECASE)
-    response = re.sub(r"\(\s*node_id\s*:\s*[^\)]+\)", "", response, flags=re.IGNORECASE)
-    response = re.sub(r" {2,}", " ", response)
-    lines = [ln for ln in response.splitlines() if not re.match(r"^\s*(Note:|Validation:)", ln)]
-    return '\n'.join(lines).strip()
+    response = _STRIP_RE.sub("", response)
+    response = _WS_RE.sub(" ", response)
+    return '\n'.join(ln for ln in response.splitlines() if not _META_RE.match(ln)).strip()
 
 
 def expand_citations(response: str, matches: List[Dict[str, Any]] = None, graph_facts: List[Dict[str, Any]] = None) -> str:
@@ -98,7 +116,7 @@ def expand_citations(response: str, matches: List[Dict[str, Any]] = None, graph_
 
     def repl(match):
         raw = match.group(1).strip()
-        m_id = re.search(r"(?:(?:node[_ ]?id|nodeid|id)\s*:\s*)?(?P<id>[A-Za-z0-9_-]+)", raw, flags=re.IGNORECASE)
+        m_id = _CITATION_ID_RE.search(raw)
         nodeid = m_id.group('id') if m_id else raw
         if nodeid in meta_by_id:
             meta = meta_by_id[nodeid]
@@ -113,4 +131,4 @@ def expand_citations(response: str, matches: List[Dict[str, Any]] = None, graph_
             return f"{typ} ({', '.join(found)})" if found else typ
         return match.group(0)
 
-    return re.sub(r"\[\s*([^\]]+)\s*\]", repl, response)
\ No newline at end of file
+    return _CITATION_RE.sub(repl, response)
\ No newline at end of file
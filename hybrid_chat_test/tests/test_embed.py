@@ -1,9 +1,13 @@
 # tests/test_embed.py
 # Unit tests for embed.py
 
+import asyncio
+import math
+import threading
 import unittest
-from unittest.mock import patch, MagicMock
-from embed import embed_text, embed_texts, get_text_hash
+from collections import OrderedDict
+from unittest.mock import patch, MagicMock, AsyncMock
+from embed import async_embed_texts, close_session, flush, _get_session, embed_text, embed_texts, get_text_hash, load_cache, load_many, save_many, _open_db, _to_blob
 
 class TestEmbed(unittest.TestCase):
 
@@ -25,5 +29,115 @@ class TestEmbed(unittest.TestCase):
         hash3 = get_text_hash("world")
         self.assertNotEqual(hash1, hash3)
 
+    def test_cache_roundtrip(self):
+        with patch('embed._DB', _open_db(":memory:")), patch('embed._L1', OrderedDict()):
+            hk = get_text_hash("hello", model="m")
+            self.assertIsNone(load_cache(hk))
+            save_many([(hk, [0.5, 0.25])])
+            self.assertEqual(load_cache(hk), [0.5, 0.25])
+            self.assertEqual(load_many([hk, get_text_hash("world")]), [[0.5, 0.25], None])
+            # callers get their own copy; mutating it must not touch the cache
+            load_cache(hk).append(1.0)
+            self.assertEqual(load_cache(hk), [0.5, 0.25])
+
+    def test_async_embed_texts_embeds_each_batch_once(self):
+        texts = [f"text {i}" for i in range(10)]
+        fake = AsyncMock(side_effect=lambda batch, model, **kwargs: [[float(len(t))] for t in batch])
+        with patch('embed._fetch_embeddings_aiohttp', fake):
+            result = asyncio.run(async_embed_texts(texts, batch_size=4, use_cache=False))
+        self.assertEqual(fake.await_count, math.ceil(len(texts) / 4))
+        self.assertEqual(result, [[float(len(t))] for t in texts])
+
+    def test_async_embed_texts_on_separate_loops(self):
+        # more batches than the concurrency limit, so the limiter has to wait
+        texts = [f"text {i}" for i in range(40)]
+
+        async def fetch(batch, model, **kwargs):
+            await asyncio.sleep(0)
+            return [[float(len(t))] for t in batch]
+
+        with patch('embed._fetch_embeddings_aiohttp', AsyncMock(side_effect=fetch)):
+            for _ in range(2):
+                result = asyncio.run(async_embed_texts(texts, batch_size=2, use_cache=False))
+                self.assertEqual(result, [[float(len(t))] for t in texts])
+
+    def test_flush_lands_write_backs_before_the_loop_ends(self):
+        texts = [f"text {i}" for i in range(5)]
+        fake = AsyncMock(side_effect=lambda batch, model, **kwargs: [[float(len(t))] for t in batch])
+
+        async def slow_save(items):
+            await asyncio.sleep(0.01)
+            save_many(items)
+
+        async def run():
+            await async_embed_texts(texts, batch_size=2)
+            await flush()
+
+        with patch('embed._DB', _open_db(":memory:")), patch('embed._L1', OrderedDict()), \
+                patch('embed._REDIS', None), patch('embed._fetch_embeddings_aiohttp', fake), \
+                patch('embed._save_many_async', slow_save):
+            asyncio.run(run())
+            keys = [get_text_hash(t, model="text-embedding-3-small") for t in texts]
+            self.assertEqual(load_many(keys), [[float(len(t))] for t in texts])
+
+    def test_redis_hits_are_copied_to_the_local_tiers(self):
+        texts = ["a", "bb"]
+        redis = MagicMock()
+        redis.mget = AsyncMock(return_value=[_to_blob([1.0]), _to_blob([2.0])])
+        fetch = AsyncMock()
+        db, l1 = _open_db(":memory:"), OrderedDict()
+
+        async def run():
+            result = await async_embed_texts(texts)
+            await flush()
+            return result
+
+        with patch('embed._DB', db), patch('embed._L1', l1), patch('embed._REDIS', redis), \
+                patch('embed._fetch_embeddings_aiohttp', fetch):
+            self.assertEqual(asyncio.run(run()), [[1.0], [2.0]])
+            keys = [get_text_hash(t, model="text-embedding-3-small") for t in texts]
+            self.assertEqual(list(l1), keys)
+            l1.clear()
+            self.assertEqual(load_many(keys), [[1.0], [2.0]])
+        fetch.assert_not_awaited()
+
+    def test_sessions_are_kept_per_loop(self):
+        other = asyncio.new_event_loop()
+        thread = threading.Thread(target=other.run_forever, daemon=True)
+        thread.start()
+        try:
+            other_session = asyncio.run_coroutine_threadsafe(_get_session(), other).result(timeout=5)
+
+            async def use_own(close=False):
+                session = await _get_session()
+                self.assertIs(await _get_session(), session)
+                if close:
+                    await close_session()
+                return session
+
+            # a second loop gets its own session and leaves the live one open;
+            # the one left by the finished asyncio.run loop is dropped later
+            first = asyncio.run(use_own())
+            second = asyncio.run(use_own(close=True))
+            self.assertIsNot(first, other_session)
+            self.assertIsNot(second, first)
+            # let the other loop run anything scheduled on it meanwhile
+            asyncio.run_coroutine_threadsafe(asyncio.sleep(0.05), other).result(timeout=5)
+            self.assertFalse(other_session.closed)
+            self.assertTrue(first.closed)
+            asyncio.run_coroutine_threadsafe(close_session(), other).result(timeout=5)
+            self.assertTrue(other_session.closed)
+            self.assertTrue(second.closed)
+        finally:
+            other.call_soon_threadsafe(other.stop)
+            thread.join()
+            other.close()
+
+    def test_async_embed_texts_raises_the_batch_error(self):
+        fake = AsyncMock(side_effect=ValueError("boom"))
+        with patch('embed._fetch_embeddings_aiohttp', fake):
+            with self.assertRaises(ValueError):
+                asyncio.run(async_embed_texts(["a", "b", "c"], batch_size=1, use_cache=False))
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
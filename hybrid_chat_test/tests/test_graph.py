@@ -0,0 +1,63 @@
+# tests/test_graph.py
+# Unit tests for graph.py
+
+import asyncio
+import unittest
+from unittest.mock import patch, MagicMock
+import async_graph
+import graph
+
+class TestGraph(unittest.TestCase):
+
+    @patch('graph.driver')
+    def test_fetch_graph_context_represents_every_seed(self, mock_driver):
+        seeds = ["s1", "s2", "s3"]
+
+        def run(query, **params):
+            if "pairs" in params:
+                # every neighbour has the full HOP2_LIMIT of second hops
+                return [
+                    {"src": p["src"], "mid": p["mid"], "rel2": "R2", "labels2": ["Entity"],
+                     "id2": f"{p['mid']}_o{k}", "name2": "o", "description2": ""}
+                    for p in params["pairs"] for k in range(graph.HOP2_LIMIT)
+                ]
+            return [
+                {"nid": nid, "rel": "R", "labels": ["Entity"], "id": f"{nid}_m{k}",
+                 "name": "m", "description": ""}
+                for nid in params["node_ids"] for k in range(graph.HOP1_LIMIT)
+            ]
+
+        session = MagicMock()
+        session.run.side_effect = run
+        mock_driver.session.return_value.__enter__.return_value = session
+
+        facts = graph.fetch_graph_context(seeds)
+        self.assertEqual(len(facts), 50)
+        hop1_targets = [f["target_id"] for f in facts if f["source"] is None]
+        self.assertEqual(len(hop1_targets), len(seeds) * graph.HOP1_LIMIT)
+        for seed in seeds:
+            self.assertTrue(any(t.startswith(seed + "_") for t in hop1_targets))
+            self.assertTrue(any((f["source"] or "").startswith(seed + "_") for f in facts))
+
+    def test_fetch_graph_context_async_represents_every_seed(self):
+        seeds = ["s1", "s2", "s3"]
+
+        async def fetch_one(driver, nid):
+            # 10 neighbours, each followed by 9 second hops: 100 facts per seed
+            facts = []
+            for k in range(10):
+                mid = f"{nid}_m{k}"
+                facts.append({"source": None, "rel": "R", "target_id": mid})
+                facts.extend({"source": mid, "rel": "R2", "target_id": f"{mid}_o{j}"} for j in range(9))
+            return facts
+
+        with patch('async_graph._fetch_one', side_effect=fetch_one):
+            facts = asyncio.run(async_graph.fetch_graph_context_async(seeds, driver=object(), use_cache=False))
+        self.assertEqual(len(facts), 50)
+        hop1_targets = [f["target_id"] for f in facts if f["source"] is None]
+        self.assertEqual(len(hop1_targets), 30)
+        for seed in seeds:
+            self.assertTrue(any(t.startswith(seed + "_") for t in hop1_targets))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,13 +2,31 @@
 # Pinecone vector search utilities
 
 from typing import List, Dict, Any
+import asyncio
+import functools
+import threading
 import pinecone
 from pinecone import Pinecone, ServerlessSpec
 import config
-from embed import embed_text
+from adapters.pinecone_adapter import upsert_index
+from embed import embed_text, async_embed_text
 
 pc = Pinecone(api_key=config.PINECONE_API_KEY)
 
+# Index handle shared by queries and upserts; each pc.Index() builds a new
+# HTTP client, so it is created once
+_INDEX = None
+_INDEX_LOCK = threading.Lock()
+
+def _index():
+    """Return the shared handle for the configured index."""
+    global _INDEX
+    if _INDEX is None:
+        with _INDEX_LOCK:
+            if _INDEX is None:
+                _INDEX = pc.Index(config.PINECONE_INDEX_NAME)
+    return _INDEX
+
 def create_index_if_not_exists():
     """Create Pinecone index if it doesn't exist."""
     if config.PINECONE_INDEX_NAME not in pc.list_indexes().names():
@@ -22,7 +40,7 @@ def create_index_if_not_exists():
 
 def query_pinecone(query_text: str, top_k: int = 10) -> List[Dict[str, Any]]:
     """Query Pinecone index using embedding."""
-    index = pc.Index(config.PINECONE_INDEX_NAME)
+    index = _index()
     vec = embed_text(query_text)
     res = index.query(
         vector=vec,
@@ -32,7 +50,25 @@ def query_pinecone(query_text: str, top_k: int = 10) -> List[Dict[str, Any]]:
     )
     return res.get("matches", [])
 
+async def async_query_pinecone(query_text: str, top_k: int = 10) -> List[Dict[str, Any]]:
+    """Async variant: embeds via aiohttp and runs the blocking query in an executor."""
+    vec = await async_embed_text(query_text)
+    index = _index()
+    loop = asyncio.get_running_loop()
+    res = await loop.run_in_executor(None, functools.partial(
+        index.query,
+        vector=vec,
+        top_k=top_k,
+        include_metadata=True,
+        include_values=False
+    ))
+    return res.get("matches", [])
+
 def upsert_vectors(vectors: List[Dict[str, Any]]):
-    """Upsert vectors to Pinecone."""
-    index = pc.Index(config.PINECONE_INDEX_NAME)
-    index.upsert(vectors)
\ No newline at end of file
+    """Upsert vectors to Pinecone (chunked, with the adapter's 429/5xx retry)."""
+    upsert_index(_index(), vectors)
+
+async def async_upsert_vectors(vectors: List[Dict[str, Any]]):
+    """Async variant: runs the blocking upsert in an executor."""
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, upsert_vectors, vectors)
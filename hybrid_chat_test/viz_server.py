@@ -2,11 +2,39 @@
 # viz_server.py
 # Flask server for serving visualization assets and sample graph data
 
-from flask import Flask, send_from_directory, jsonify
+from flask import Flask, Response, send_from_directory, jsonify
 import os
-import json
+try:
+    # ASGI adapter so the app can run under uvicorn instead of the dev server
+    from asgiref.wsgi import WsgiToAsgi
+    _ASGI_AVAILABLE = True
+except Exception:
+    WsgiToAsgi = None
+    _ASGI_AVAILABLE = False
+try:
+    import uvicorn
+    _UVICORN_AVAILABLE = True
+except Exception:
+    uvicorn = None
+    _UVICORN_AVAILABLE = False
+
+SAMPLE_GRAPH_FILE = 'data/sample_graph.json'
 
 app = Flask(__name__)
+asgi_app = WsgiToAsgi(app) if _ASGI_AVAILABLE else None
+
+# (mtime, raw bytes) of the sample graph; re-read only when the file changes
+_GRAPH_CACHE = (None, None)
+
+def _get_graph_bytes():
+    global _GRAPH_CACHE
+    mtime = os.stat(SAMPLE_GRAPH_FILE).st_mtime
+    cached_mtime, data = _GRAPH_CACHE
+    if cached_mtime != mtime:
+        with open(SAMPLE_GRAPH_FILE, 'rb') as f:
+            data = f.read()
+        _GRAPH_CACHE = (mtime, data)
+    return data
 
 # Serve static files from current directory
 @app.route('/')
@@ -21,9 +49,8 @@ def static_files(path):
 @app.route('/sample_graph')
 def sample_graph():
     try:
-        with open('data/sample_graph.json', 'r') as f:
-            data = json.load(f)
-        return jsonify(data)
+        # served as-is from memory; no per-request read or JSON round-trip
+        return Response(_get_graph_bytes(), mimetype='application/json')
     except FileNotFoundError:
         return jsonify({"error": "Sample graph not found"}), 404
 
@@ -34,4 +61,7 @@ def status():
 if __name__ == '__main__':
     print("Starting visualization server...")
     print("Open http://localhost:5000/neo4j_viz.html?local=true")
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    if _ASGI_AVAILABLE and _UVICORN_AVAILABLE:
+        uvicorn.run("viz_server:asgi_app", host='0.0.0.0', port=5000, workers=2)
+    else:
+        app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file